@@ -1,42 +1,173 @@
+import io
+import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import matplotlib.pyplot as plt
-
-from core.validator import validate_and_load, CSVValidationError
-from core.preprocessing import preprocess_dataframe
-from core.categorizer import categorize_dataframe
-from core.anomaly import apply_anomaly_detection
-from core.report import (
-    generate_summary_metrics,
-    spend_by_category,
-    top_5_largest_transactions,
-    anomaly_breakdown,
-    monthly_spend_trend,
-    average_spend_per_category
-)
-from core.exporter import generate_csv_export, generate_pdf_report
+
+# Only streamlit is imported up front. pandas, the pipeline, the LLM client,
+# charting and the exporters load with the first upload, so the empty page
+# paints without paying for them.
 
 st.set_page_config(page_title="AI Expense Categorizer")
 
+
+def pipeline_config_key(use_baseline: bool = False):
+    from core.categorizer import RULE_BASED_KEYWORDS
+    from core.cache import config_fingerprint
+
+    # Rule keywords plus the category/model fingerprint used by the LLM cache
+    payload = json.dumps(
+        {"rules": RULE_BASED_KEYWORDS, "llm": config_fingerprint(), "baseline": use_baseline},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def process_upload(content_hash: str, config_key: str, use_baseline: bool, _content: bytes):
+    """
+    Runs validate -> preprocess -> categorize -> anomaly detection once per
+    (file content, config). Reruns, including download button clicks, are
+    served from Streamlit's cache without any LLM calls. The raw bytes are
+    excluded from Streamlit's own hashing since content_hash covers them.
+
+    With use_baseline, category outliers are scored against the stored
+    history and the file is merged into it (once per content hash).
+    """
+    from core.validator import validate_and_load
+    from core.pipeline import run_pipeline
+    from core.baseline import CategoryBaseline
+
+    df = validate_and_load(io.BytesIO(_content))
+
+    baseline = CategoryBaseline() if use_baseline else None
+
+    # The freshly loaded frame is ours, so stages can add columns in place
+    df = run_pipeline(df, inplace=True, baseline=baseline, upload_id=content_hash)
+
+    return df, df.attrs.get("llm_stats", {})
+
+
+@st.cache_resource(max_entries=4)
+def report_bundle(content_hash: str, config_key: str, _df):
+    # Aggregates computed once per dataset; the bundle is immutable, so it
+    # is safe to share across sessions and with the PDF worker
+    from core.report import build_report
+
+    return build_report(_df)
+
+
+def build_pdf_report(df, report, appendix=None):
+    import tempfile
+    from core.exporter import PDF_SPOOL_BYTES, generate_pdf_report
+
+    # Large appendices are written to disk while reportlab saves, then read
+    # back once as the download payload
+    with tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_BYTES) as output:
+        generate_pdf_report(df, report=report, appendix=appendix, output=output)
+        output.seek(0)
+        return output.read()
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def columnar_exports(content_hash: str, config_key: str, _df):
+    # Serialized once per dataset; download clicks rerun the script
+    from core.exporter import generate_parquet_export, generate_arrow_export
+
+    return generate_parquet_export(_df), generate_arrow_export(_df)
+
+
+@st.cache_resource
+def pdf_executor():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="pdf-report")
+
+
+@st.cache_resource(max_entries=4)
+def pdf_report_job(content_hash: str, config_key: str, appendix, _df, _report):
+    """
+    Starts rendering the PDF in the background once per dataset (and
+    appendix choice) and returns the Future, so the dashboard never waits
+    on reportlab and repeat downloads reuse the finished bytes.
+    """
+    return pdf_executor().submit(build_pdf_report, _df, _report, appendix)
+
+
+@st.fragment(run_every=1.0)
+def wait_for_pdf(job):
+    if job.done():
+        st.rerun()
+    st.info("Preparing PDF report...")
+
+
 st.title("AI Expense Categorizer")
 
 uploaded_file = st.file_uploader("Upload Expense CSV", type=["csv"])
 
+use_baseline = st.checkbox(
+    "Score against historical baseline",
+    help="Compare amounts with all previously merged uploads, not just this file"
+)
+
+PDF_APPENDIX_OPTIONS = {
+    "None": None,
+    "Flagged transactions": "flagged",
+    "Full ledger": "all",
+}
+
+pdf_appendix = st.selectbox(
+    "PDF transaction appendix",
+    list(PDF_APPENDIX_OPTIONS),
+    help="List flagged transactions or the whole ledger at the end of the PDF report"
+)
+
 if uploaded_file:
+    from core.validator import CSVValidationError
+    from core.charts import category_chart_spec, monthly_trend_chart_spec, render_charts
+    from core.exporter import generate_csv_export
+    from core.report import (
+        generate_summary_metrics,
+        spend_by_category,
+        top_5_largest_transactions,
+        anomaly_breakdown,
+        average_spend_per_category
+    )
+
     try:
-        df = validate_and_load(uploaded_file)
-        df = preprocess_dataframe(df)
+        content = uploaded_file.getvalue()
+        content_hash = hashlib.sha256(content).hexdigest()
+
+        with st.spinner("Categorizing expenses and detecting anomalies..."):
+            config_key = pipeline_config_key(use_baseline)
+            df, llm_stats = process_upload(content_hash, config_key, use_baseline, content)
 
         st.success("File processed successfully!")
 
-        with st.spinner("Categorizing expenses..."):
-            df = categorize_dataframe(df)
+        report = report_bundle(content_hash, config_key, df)
+
+        # Both charts in one call (parallel on a cold cache); the PDF job
+        # started below then reuses the same cached images
+        category_png, trend_png = render_charts([
+            category_chart_spec(report.category_summary),
+            monthly_trend_chart_spec(report.monthly_trend),
+        ])
+
+        pdf_job = pdf_report_job(
+            content_hash, config_key, PDF_APPENDIX_OPTIONS[pdf_appendix], df, report
+        )
 
         st.subheader("Categorized Data")
         st.dataframe(df.head(100))
         st.write(df["classification_source"].value_counts())
 
-        with st.spinner("Detecting anomalies..."):
-            df = apply_anomaly_detection(df)
+        if llm_stats.get("requests"):
+            st.caption(
+                f"LLM requests: {llm_stats['requests']} · "
+                f"retries: {llm_stats['retries']} · "
+                f"rate limited: {llm_stats['rate_limited']} · "
+                f"recovered rows: {llm_stats['recovered_rows']} · "
+                f"unresolved rows: {llm_stats['failed_rows']}"
+            )
         
         st.subheader("Anomaly Summary")
         st.write(df["anomaly_flag"].value_counts())
@@ -47,7 +178,7 @@ if uploaded_file:
         st.header("Executive Summary Dashboard")
         
         # --- Metrics ---
-        metrics = generate_summary_metrics(df)
+        metrics = generate_summary_metrics(report)
         
         col1, col2, col3 = st.columns(3)
         
@@ -58,42 +189,33 @@ if uploaded_file:
         # --- Spend by Category ---
         st.subheader("Spend by Category")
         
-        category_summary = spend_by_category(df)
+        category_summary = spend_by_category(report)
         st.dataframe(category_summary)
         
         # Bar Chart
-        fig, ax = plt.subplots()
-        ax.bar(category_summary["category"], category_summary["amount"])
-        ax.set_xticklabels(category_summary["category"], rotation=45)
-        ax.set_ylabel("Total Spend")
-        st.pyplot(fig)
+        st.image(category_png)
         
         # --- Top 5 Largest Transactions ---
         st.subheader("Top 5 Largest Transactions")
-        st.dataframe(top_5_largest_transactions(df))
+        st.dataframe(top_5_largest_transactions(report))
         
         # --- Anomaly Breakdown ---
         st.subheader("Anomaly Breakdown")
-        breakdown = anomaly_breakdown(df)
+        breakdown = anomaly_breakdown(report)
         
         st.write(f"Category-based anomalies: {breakdown['category_anomalies']}")
         st.write(f"Duplicate anomalies: {breakdown['duplicate_anomalies']}")
+        st.write(f"Near-duplicate charges: {breakdown['near_duplicate_anomalies']}")
         st.write(f"High absolute risk transactions: {breakdown['high_absolute_risk']}")
         
         # --- Monthly Trend ---
         st.subheader("Monthly Spend Trend")
         
-        monthly = monthly_spend_trend(df)
-        
-        fig2, ax2 = plt.subplots()
-        ax2.plot(monthly["month"], monthly["amount"])
-        ax2.set_xticklabels(monthly["month"], rotation=45)
-        ax2.set_ylabel("Monthly Spend")
-        st.pyplot(fig2)
+        st.image(trend_png)
         
         # --- Average Spend Per Category ---
         st.subheader("Average Spend per Category")
-        st.dataframe(average_spend_per_category(df))
+        st.dataframe(average_spend_per_category(report))
 
         st.header("Export Reports")
 
@@ -107,22 +229,36 @@ if uploaded_file:
             mime="text/csv"
         )
         
-        # PDF Export
-        pdf_buffer = generate_pdf_report(
-            df,
-            metrics,
-            category_summary,
-            breakdown,
-            top_5_largest_transactions(df)
+        # Parquet / Arrow Export
+        parquet_data, arrow_data = columnar_exports(content_hash, config_key, df)
+
+        st.download_button(
+            label="Download Parquet",
+            data=parquet_data,
+            file_name="processed_expense_report.parquet",
+            mime="application/vnd.apache.parquet"
         )
-        
+
         st.download_button(
-            label="Download PDF Report",
-            data=pdf_buffer,
-            file_name="expense_report.pdf",
-            mime="application/pdf"
+            label="Download Arrow (IPC)",
+            data=arrow_data,
+            file_name="processed_expense_report.arrow",
+            mime="application/vnd.apache.arrow.file"
         )
-        
+
+        # PDF Export
+        if not pdf_job.done():
+            wait_for_pdf(pdf_job)
+        elif pdf_job.exception() is not None:
+            st.error(f"PDF report failed: {str(pdf_job.exception())}")
+        else:
+            st.download_button(
+                label="Download PDF Report",
+                data=pdf_job.result(),
+                file_name="expense_report.pdf",
+                mime="application/pdf"
+            )
+
     except CSVValidationError as e:
         st.error(str(e))
 
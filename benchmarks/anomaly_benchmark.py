@@ -0,0 +1,98 @@
+"""
+Scaling benchmark for the grouped category z-score kernel.
+
+    python -m benchmarks.anomaly_benchmark
+    python -m benchmarks.anomaly_benchmark --rows 100000 1000000 10000000 --categories 300 --legacy-max-rows 1000000
+
+Reports seconds and ns/row per size; a roughly constant ns/row means
+linear scaling. Up to --legacy-max-rows it also times the previous
+per-category loop and checks both produce the same scores.
+"""
+
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from core.anomaly import detect_category_outliers
+
+
+def legacy_detect_category_outliers(df: pd.DataFrame, z_threshold: float = 2.5):
+    # Per-category mask loop that detect_category_outliers replaced
+    df = df.copy()
+    df["category_zscore"] = 0.0
+    df["category_outlier_flag"] = False
+
+    for category in df["category"].unique():
+        subset = df[df["category"] == category]
+
+        if len(subset) < 5:
+            continue
+
+        mean = subset["amount"].mean()
+        std = subset["amount"].std()
+
+        if std == 0:
+            continue
+
+        z_scores = (subset["amount"] - mean) / std
+
+        df.loc[subset.index, "category_zscore"] = z_scores
+        df.loc[subset.index, "category_outlier_flag"] = z_scores.abs() > z_threshold
+
+    return df
+
+
+def make_frame(rows: int, categories: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Category {i:04d}" for i in range(categories)], dtype=object)
+
+    # Zipf-ish popularity so some categories are tiny (< 5 rows)
+    weights = 1.0 / np.arange(1, categories + 1)
+    codes = rng.choice(categories, size=rows, p=weights / weights.sum())
+
+    return pd.DataFrame({
+        "category": names[codes],
+        "amount": rng.gamma(2.0, 1500.0, rows).round(2),
+    })
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Category z-score kernel benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--categories", type=int, default=300)
+    parser.add_argument("--legacy-max-rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'grouped s':>10} {'ns/row':>8} {'legacy s':>10} {'speedup':>8}")
+
+    for rows in args.rows:
+        df = make_frame(rows, args.categories)
+        grouped, grouped_seconds = timed(detect_category_outliers, df)
+
+        legacy_text = f"{'-':>10} {'-':>8}"
+        if rows <= args.legacy_max_rows:
+            legacy, legacy_seconds = timed(legacy_detect_category_outliers, df)
+            np.testing.assert_allclose(
+                grouped["category_zscore"].to_numpy(),
+                legacy["category_zscore"].to_numpy(dtype=float),
+                rtol=1e-9,
+                atol=1e-12
+            )
+            legacy_text = f"{legacy_seconds:>10.3f} {legacy_seconds / grouped_seconds:>7.1f}x"
+
+        print(
+            f"{rows:>10} {grouped_seconds:>10.3f} "
+            f"{grouped_seconds / rows * 1e9:>8.1f} {legacy_text}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Throughput benchmark for categorize_dataframe against the local mock Groq
+server. No network access or API key is needed.
+
+    python -m benchmarks.categorizer_benchmark
+    python -m benchmarks.categorizer_benchmark --rows 1000 10000 --batch-sizes 20 50 --latency-median 0.2
+
+For every (rows, batch size) pair it reports rows/sec, LLM round trips,
+p50/p95 batch latency, fallback rate and prompt tokens per LLM item.
+"""
+
+import io
+import time
+import argparse
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from core.categorizer import categorize_dataframe
+from llm.batching import BatchPlanner
+from llm.groq_client import GroqClient, set_default_client
+from llm.retry import RetryPolicy
+from benchmarks.mock_groq_server import MockConfig, MockGroqServer
+
+
+class RecordingPlanner(BatchPlanner):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.latencies = []
+
+    def record(self, sent, valid, latency):
+        self.latencies.append(latency)
+        super().record(sent, valid, latency)
+
+
+def make_ledger(rows: int, unique_ratio: float, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    n_unique = max(1, int(rows * unique_ratio))
+
+    # Vendor names that no rule-based keyword matches, so every row
+    # exercises the LLM path
+    vendors = np.array([f"Misc Vendor {i:07d} Pvt" for i in range(n_unique)], dtype=object)
+
+    return pd.DataFrame({
+        "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "amount": rng.gamma(2.0, 1500.0, rows).round(2),
+        "description": vendors[rng.integers(0, n_unique, rows)],
+    })
+
+
+def run_case(server, df, batch_size, max_in_flight, adaptive, stream):
+    if adaptive:
+        planner = RecordingPlanner(initial_items=batch_size)
+    else:
+        planner = RecordingPlanner(
+            initial_items=batch_size,
+            min_items=batch_size,
+            max_items=batch_size
+        )
+
+    server.reset_stats()
+    started = time.perf_counter()
+
+    # Parsing errors from malformed responses are expected noise here
+    with contextlib.redirect_stdout(io.StringIO()):
+        out = categorize_dataframe(
+            df,
+            batch_size=batch_size,
+            max_in_flight=max_in_flight,
+            retry_policy=RetryPolicy(base_delay=0.05, max_delay=1.0),
+            planner=planner,
+            use_cache=False,
+            stream=stream
+        )
+
+    elapsed = time.perf_counter() - started
+    server_stats = server.stats()
+    latencies = np.array(planner.latencies) if planner.latencies else np.zeros(1)
+
+    return {
+        "rows": len(df),
+        "batch_size": batch_size,
+        "rows_per_sec": len(df) / elapsed,
+        "round_trips": server_stats["requests"] + server_stats["rate_limited"],
+        "p50_ms": np.percentile(latencies, 50) * 1000,
+        "p95_ms": np.percentile(latencies, 95) * 1000,
+        "fallback_rate": (out["classification_source"] == "fallback").mean(),
+        "prompt_tokens_per_item": (
+            server_stats["prompt_tokens"] / server_stats["items"] if server_stats["items"] else 0.0
+        ),
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="categorize_dataframe throughput benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 20, 50, 100])
+    parser.add_argument("--unique-ratio", type=float, default=0.2,
+                        help="distinct descriptions as a share of rows")
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--adaptive", action="store_true",
+                        help="let the planner resize batches instead of pinning batch size")
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--latency-median", type=float, default=0.05)
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--latency-per-item", type=float, default=0.001)
+    parser.add_argument("--rpm", type=int, default=None)
+    parser.add_argument("--tpm", type=int, default=None)
+    parser.add_argument("--malformed-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        latency_per_item=args.latency_per_item,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        malformed_rate=args.malformed_rate
+    )
+
+    header = (
+        f"{'rows':>8} {'batch':>6} {'rows/s':>10} {'trips':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'fallback':>9} {'tok/item':>9}"
+    )
+
+    with MockGroqServer(config) as server:
+        previous = set_default_client(
+            GroqClient(api_key="mock", url=server.url, pool_size=args.max_in_flight)
+        )
+        try:
+            print(header)
+            for rows in args.rows:
+                df = make_ledger(rows, args.unique_ratio)
+                for batch_size in args.batch_sizes:
+                    r = run_case(server, df, batch_size, args.max_in_flight, args.adaptive, args.stream)
+                    print(
+                        f"{r['rows']:>8} {r['batch_size']:>6} {r['rows_per_sec']:>10.0f} "
+                        f"{r['round_trips']:>7} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+                        f"{r['fallback_rate']:>9.2%} {r['prompt_tokens_per_item']:>9.1f}"
+                    )
+        finally:
+            set_default_client(previous)
+
+
+if __name__ == "__main__":
+    main()
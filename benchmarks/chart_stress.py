@@ -0,0 +1,119 @@
+"""
+Stress check for concurrent chart rendering, as Streamlit does with one
+thread per session.
+
+    python -m benchmarks.chart_stress
+    python -m benchmarks.chart_stress --threads 16 --rounds 10 --max-growth-mb 16
+
+Every round renders each chart spec from many threads at once, bypassing
+the chart cache. The check fails (exit code 1) if any render raises, if
+the same spec produces different bytes on different threads (a sign of
+shared figure state), if pyplot ever holds a figure, or if resident
+memory keeps growing after the warm-up round.
+"""
+
+import gc
+import sys
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from matplotlib import _pylab_helpers
+
+from core.charts import chart_spec, render_chart
+
+
+def resident_mb() -> float:
+    # Current (not peak) RSS, so a leak shows up as growth between rounds
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        import resource
+        return pages * resource.getpagesize() / 2 ** 20
+    except (OSError, ImportError):
+        import tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        return tracemalloc.get_traced_memory()[0] / 2 ** 20
+
+
+def make_specs(count: int):
+    specs = []
+    for i in range(count):
+        labels = [f"Item {i}-{j}" for j in range(8 + i % 5)]
+        values = [(i * 37 + j * 11) % 97 + 1.5 for j in range(len(labels))]
+        specs.append(chart_spec(
+            "bar" if i % 2 else "line",
+            labels,
+            values,
+            title=f"Chart {i}",
+            ylabel="Amount"
+        ))
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent chart rendering stress check")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=6)
+    parser.add_argument("--specs", type=int, default=4)
+    parser.add_argument("--max-growth-mb", type=float, default=16.0)
+    args = parser.parse_args()
+
+    specs = make_specs(args.specs)
+    expected = [render_chart(spec) for spec in specs]
+    start_barrier = threading.Barrier(args.threads)
+
+    def worker(_):
+        start_barrier.wait()
+        return [render_chart(spec) for spec in specs]
+
+    failures = []
+    memory = []
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for round_number in range(args.rounds):
+            started = time.perf_counter()
+            try:
+                outputs = list(pool.map(worker, range(args.threads)))
+            except Exception as e:
+                failures.append(f"round {round_number}: render raised {e!r}")
+                break
+
+            mismatched = sum(
+                1 for output in outputs
+                for got, want in zip(output, expected) if got != want
+            )
+            if mismatched:
+                failures.append(f"round {round_number}: {mismatched} renders differ from the reference")
+
+            open_figures = _pylab_helpers.Gcf.get_num_fig_managers()
+            if open_figures:
+                failures.append(f"round {round_number}: pyplot holds {open_figures} figures")
+
+            gc.collect()
+            memory.append(resident_mb())
+            renders = args.threads * len(specs)
+            print(
+                f"round {round_number}: {renders} renders in "
+                f"{time.perf_counter() - started:.2f}s, rss {memory[-1]:.1f} MiB"
+            )
+
+    # Round 0 pays one-off costs (font cache, glyph caches)
+    if len(memory) > 2:
+        growth = memory[-1] - memory[1]
+        print(f"rss growth after warm-up: {growth:+.1f} MiB (budget {args.max_growth_mb} MiB)")
+        if growth > args.max_growth_mb:
+            failures.append(f"memory grew {growth:.1f} MiB after warm-up")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
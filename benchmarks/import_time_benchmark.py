@@ -0,0 +1,100 @@
+"""
+Cold-start import benchmark with a budget check for the app's first paint.
+
+    python -m benchmarks.import_time_benchmark
+    python -m benchmarks.import_time_benchmark --budget-ms 800 --repeat 5
+    python -m benchmarks.import_time_benchmark --module core.categorizer --deferred pydantic requests dotenv
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters
+(default: app, which executes the page up to the file uploader without a
+browser), keeps the fastest run, and prints the module's cumulative
+import time and the heaviest packages by self time. Exits with code 1 if
+the time is over budget or if any of the deferred packages was imported.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+from collections import Counter
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Stacks that must only load once they are used (after an upload)
+DEFAULT_DEFERRED = [
+    "pandas", "numpy", "matplotlib", "reportlab", "pyarrow",
+    "pydantic", "requests", "dotenv",
+]
+
+
+def import_profile(module: str):
+    """Returns (cumulative microseconds of module, {package: self us})."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+
+    total = None
+    packages = Counter()
+
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        packages[name.split(".")[0]] += int(self_us)
+
+        if name == module:
+            total = int(cumulative_us)
+
+    return total, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time budget check")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--deferred", nargs="*", default=DEFAULT_DEFERRED)
+    args = parser.parse_args()
+
+    # One untimed run so bytecode compilation doesn't count
+    import_profile(args.module)
+
+    runs = [import_profile(args.module) for _ in range(args.repeat)]
+    total, packages = min(runs, key=lambda run: run[0])
+    total_ms = total / 1000
+
+    print(f"import {args.module}: {total_ms:.1f} ms (best of {args.repeat}, budget {args.budget_ms:.0f} ms)")
+    print()
+    print(f"{'package':<24} {'self ms':>8}")
+    for name, self_us in packages.most_common(args.top):
+        print(f"{name:<24} {self_us / 1000:>8.1f}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"{total_ms:.1f} ms is over the {args.budget_ms:.0f} ms budget")
+
+    loaded = [name for name in args.deferred if name in packages]
+    if loaded:
+        failures.append(f"imported eagerly: {', '.join(loaded)}")
+
+    print()
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
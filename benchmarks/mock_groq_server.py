@@ -0,0 +1,366 @@
+"""
+Local stand-in for Groq's /openai/v1/chat/completions endpoint.
+
+Classifies the transactions in a build_batch_prompt() prompt with a
+deterministic hash, with configurable latency, rate limits, malformed
+responses and token accounting. Supports both regular and streaming
+(server-sent events) completions.
+
+Run standalone and point the app at it:
+
+    python -m benchmarks.mock_groq_server --port 8765
+    GROQ_URL=http://127.0.0.1:8765/openai/v1/chat/completions streamlit run app.py
+"""
+
+import re
+import gzip
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.categories import CATEGORIES
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+_TRANSACTION_LINE = re.compile(r"^(\d+)\|(.*)$")
+
+
+class MockConfig:
+    def __init__(
+        self,
+        latency_median: float = 0.05,
+        latency_sigma: float = 0.3,
+        latency_per_item: float = 0.0,
+        requests_per_minute: int = None,
+        tokens_per_minute: int = None,
+        rate_window: float = 60.0,
+        malformed_rate: float = 0.0,
+        stream_chunk_chars: int = 16,
+        seed: int = 0
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.latency_per_item = latency_per_item
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.rate_window = rate_window
+        self.malformed_rate = malformed_rate
+        self.stream_chunk_chars = stream_chunk_chars
+        self.seed = seed
+
+
+def _tokens(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+
+def classify(description: str) -> str:
+    digest = hashlib.md5(description.encode("utf-8")).digest()
+    return CATEGORIES[digest[0] % len(CATEGORIES)]
+
+
+def parse_transactions(prompt: str):
+    items = []
+    for line in prompt.splitlines():
+        match = _TRANSACTION_LINE.match(line)
+        if match:
+            items.append((int(match.group(1)), json.loads(match.group(2))))
+    return items
+
+
+class MockGroqServer:
+    """
+    Threaded HTTP server; use as a context manager or start()/stop().
+    Counters are available from .stats() or GET /stats.
+    """
+
+    def __init__(self, config: MockConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self._rng = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._request_times = deque()
+        self._token_times = deque()
+        self._counts = {}
+        self.reset_stats()
+
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{COMPLETIONS_PATH}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def reset_stats(self):
+        with self._lock:
+            self._counts = {
+                "requests": 0,
+                "rate_limited": 0,
+                "malformed": 0,
+                "items": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+            }
+            self._request_times.clear()
+            self._token_times.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def _random(self):
+        with self._lock:
+            return self._rng.random(), self._rng.lognormvariate(0, 1)
+
+    # --- rate limiting -------------------------------------------------
+
+    def _admit(self, prompt_tokens: int):
+        """Returns (admitted, headers) for a sliding-window rate limit."""
+        cfg = self.config
+        now = time.monotonic()
+        cutoff = now - cfg.rate_window
+
+        with self._lock:
+            while self._request_times and self._request_times[0] < cutoff:
+                self._request_times.popleft()
+            while self._token_times and self._token_times[0][0] < cutoff:
+                self._token_times.popleft()
+
+            used_tokens = sum(tokens for _, tokens in self._token_times)
+            headers = {}
+            admitted = True
+            retry_after = 0.0
+
+            if cfg.requests_per_minute is not None:
+                remaining = cfg.requests_per_minute - len(self._request_times)
+                if remaining <= 0:
+                    admitted = False
+                    retry_after = self._request_times[0] + cfg.rate_window - now
+                reset = (self._request_times[0] + cfg.rate_window - now) if self._request_times else 0.0
+                headers["x-ratelimit-limit-requests"] = str(cfg.requests_per_minute)
+                headers["x-ratelimit-remaining-requests"] = str(max(0, remaining - (1 if admitted else 0)))
+                headers["x-ratelimit-reset-requests"] = f"{max(0.0, reset):.2f}s"
+
+            if cfg.tokens_per_minute is not None:
+                remaining = cfg.tokens_per_minute - used_tokens
+                if remaining < prompt_tokens and self._token_times:
+                    admitted = False
+                    retry_after = max(retry_after, self._token_times[0][0] + cfg.rate_window - now)
+                reset = (self._token_times[0][0] + cfg.rate_window - now) if self._token_times else 0.0
+                headers["x-ratelimit-limit-tokens"] = str(cfg.tokens_per_minute)
+                headers["x-ratelimit-remaining-tokens"] = str(
+                    max(0, remaining - (prompt_tokens if admitted else 0))
+                )
+                headers["x-ratelimit-reset-tokens"] = f"{max(0.0, reset):.2f}s"
+
+            if admitted:
+                self._request_times.append(now)
+                self._token_times.append((now, prompt_tokens))
+            else:
+                headers["retry-after"] = f"{max(0.01, retry_after):.2f}"
+
+            return admitted, headers
+
+    # --- responses ------------------------------------------------------
+
+    def _content(self, items):
+        results = [
+            {"id": item_id, "category": classify(desc), "confidence": 0.9}
+            for item_id, desc in items
+        ]
+
+        roll, _ = self._random()
+        if roll < self.config.malformed_rate:
+            self._count(malformed=1)
+            mode = int(roll / self.config.malformed_rate * 3)
+
+            if mode == 0:
+                # Truncated JSON
+                text = json.dumps({"results": results})
+                return text[: len(text) // 2]
+            if mode == 1:
+                # Drops roughly a third of the items
+                results = [r for i, r in enumerate(results) if i % 3 != 1]
+            elif results:
+                results[0]["category"] = "Unknown"
+
+        return json.dumps({"results": results})
+
+    def _latency(self, n_items: int) -> float:
+        _, lognormal = self._random()
+        cfg = self.config
+        base = cfg.latency_median * (lognormal ** cfg.latency_sigma) if cfg.latency_median else 0.0
+        return base + cfg.latency_per_item * n_items
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle(self):
+                # Clients dropping keep-alive connections is routine here
+                try:
+                    super().handle()
+                except (ConnectionResetError, BrokenPipeError):
+                    pass
+
+            def _send_json(self, status, body, headers=None):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path == "/stats":
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != COMPLETIONS_PATH:
+                    self._send_json(404, {"error": "not found"})
+                    return
+
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+
+                payload = json.loads(body)
+                prompt = payload["messages"][-1]["content"]
+                prompt_tokens = _tokens(prompt)
+
+                admitted, headers = server._admit(prompt_tokens)
+                if not admitted:
+                    server._count(rate_limited=1)
+                    self._send_json(429, {"error": {"message": "Rate limit reached"}}, headers)
+                    return
+
+                items = parse_transactions(prompt)
+                content = server._content(items)
+                completion_tokens = _tokens(content)
+                latency = server._latency(len(items))
+
+                server._count(
+                    requests=1,
+                    items=len(items),
+                    prompt_tokens=prompt_tokens,
+                    completion_tokens=completion_tokens
+                )
+
+                if payload.get("stream"):
+                    self._stream(content, latency, headers)
+                    return
+
+                time.sleep(latency)
+                self._send_json(200, {
+                    "model": payload.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                }, headers)
+
+            def _stream(self, content, latency, headers):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+
+                size = max(1, server.config.stream_chunk_chars)
+                chunks = [content[i:i + size] for i in range(0, len(content), size)]
+                delay = latency / max(1, len(chunks))
+
+                for chunk in chunks:
+                    time.sleep(delay)
+                    event = {"choices": [{"index": 0, "delta": {"content": chunk}}]}
+                    self._write_chunk(f"data: {json.dumps(event)}\n\n")
+
+                self._write_chunk("data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _write_chunk(self, text):
+                data = text.encode("utf-8")
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                self.wfile.flush()
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Groq chat-completions stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-median", type=float, default=0.05)
+    parser.add_argument("--latency-sigma", type=float, default=0.3)
+    parser.add_argument("--latency-per-item", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=None, help="requests per minute")
+    parser.add_argument("--tpm", type=int, default=None, help="prompt tokens per minute")
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        latency_per_item=args.latency_per_item,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed
+    )
+
+    server = MockGroqServer(config, host=args.host, port=args.port)
+    print(f"Mock Groq listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
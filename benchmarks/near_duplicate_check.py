@@ -0,0 +1,112 @@
+"""
+Correctness check for merchant keys and near-duplicate detection.
+
+    python -m benchmarks.near_duplicate_check
+    python -m benchmarks.near_duplicate_check --rows 200000 --max-rate 0.02
+
+Fails (exit code 1) if merchant_key merges merchants that differ only by
+their number ("Vendor 00012" / "Vendor 00034") or fails to strip
+reference numbers, if near_duplicate_mask disagrees with a brute-force
+pairwise check, or if more than --max-rate of a generated ledger (random
+vendors and amounts, so real near duplicates are rare) gets flagged.
+"""
+
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.streaming_anomaly_benchmark import GeneratedLedger
+from core.anomaly import detect_near_duplicates, near_duplicate_mask
+from core.preprocessing import merchant_key
+
+# Pairs that must get the same key
+SAME_MERCHANT = [
+    ("UBER *TRIP #3921", "Uber Trip"),
+    ("NETFLIX.COM REF 998877", "Netflix com"),
+    ("AMAZON ORDER 402-1234567-89", "Amazon"),
+    ("Airtel recharge TXN:ABC12345", "Airtel recharge"),
+    ("KFC 20240115", "KFC"),
+]
+
+# Pairs that must stay apart
+DISTINCT_MERCHANTS = [
+    ("Vendor 00012", "Vendor 00034"),
+    ("Starbucks Store 1234", "Starbucks Store 5678"),
+    ("Air India 6E123", "Air India 6E456"),
+    ("Airtel 4G", "Airtel 5G"),
+]
+
+
+def brute_force(keys, amounts, dates, window_days, amount_tolerance):
+    day = pd.to_datetime(pd.Series(dates)).to_numpy("datetime64[ns]").astype("int64")
+    window = int(window_days * 86_400 * 1_000_000_000)
+    order = np.lexsort((np.arange(len(day)), day))
+    rank = np.empty(len(day), dtype=np.intp)
+    rank[order] = np.arange(len(day))
+
+    flagged = np.zeros(len(day), dtype=bool)
+    for i in range(len(day)):
+        for j in range(len(day)):
+            if (
+                rank[j] < rank[i]
+                and keys[i] == keys[j]
+                and abs(amounts[i] - amounts[j]) <= amount_tolerance
+                and day[i] - day[j] <= window
+            ):
+                flagged[i] = True
+                break
+    return flagged
+
+
+def check_merchant_keys(failures):
+    for left, right in SAME_MERCHANT + DISTINCT_MERCHANTS:
+        a, b = merchant_key(pd.Series([left, right]))
+        if (a == b) != ((left, right) in SAME_MERCHANT):
+            failures.append(f"merchant_key({left!r}) = {a!r}, merchant_key({right!r}) = {b!r}")
+
+
+def check_against_brute_force(failures, trials: int = 30):
+    rng = np.random.default_rng(0)
+
+    for trial in range(trials):
+        n = int(rng.integers(2, 200))
+        keys = rng.integers(0, 5, n).astype(str).astype(object)
+        amounts = rng.integers(0, 40, n) * 0.5
+        dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 6 * 24, n), unit="h")
+        window = float(rng.choice([0.5, 1, 2]))
+        tolerance = float(rng.choice([0, 0.5, 1.0]))
+
+        got = near_duplicate_mask(keys, amounts, dates, window, tolerance)
+        want = brute_force(keys, amounts, dates, window, tolerance)
+        if not np.array_equal(got, want):
+            failures.append(f"trial {trial}: {int((got != want).sum())} rows differ from brute force")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate correctness check")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--max-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    failures = []
+    check_merchant_keys(failures)
+    check_against_brute_force(failures)
+
+    ledger = pd.concat(GeneratedLedger(args.rows, 50_000)).reset_index(drop=True)
+    rate = detect_near_duplicates(ledger, inplace=True)["near_duplicate_flag"].mean()
+    print(f"near-duplicate rate on {args.rows:,} generated rows: {rate:.2%} (max {args.max_rate:.0%})")
+    if rate > args.max_rate:
+        failures.append(f"{rate:.2%} of generated rows flagged as near duplicates")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
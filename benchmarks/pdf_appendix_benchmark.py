@@ -0,0 +1,169 @@
+"""
+Times the PDF report with a transaction appendix.
+
+    python -m benchmarks.pdf_appendix_benchmark
+    python -m benchmarks.pdf_appendix_benchmark --rows 100000 --appendix flagged
+    python -m benchmarks.pdf_appendix_benchmark --rows 10000 --naive
+    python -m benchmarks.pdf_appendix_benchmark --check-memory --rows 500000 --max-pages 200
+
+Builds a processed ledger (generated rows + anomaly detection, no LLM),
+then times generate_pdf_report without and with the appendix and reports
+pages, output size, whether the spooled output moved to disk and (with
+--trace-memory, which slows the run down) peak traced memory. --naive
+also times one plain Table built with iterrows, as the report did before.
+
+--check-memory traces the full-ledger appendix against the report alone
+(same prebuilt report bundle, so only the appendix differs) and exits
+with code 1 if the extra peak memory is over --page-budget-kib per
+appendix page: the page limit is what bounds appendix memory, however
+large the frame.
+"""
+
+import io
+import re
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.streaming_anomaly_benchmark import GeneratedLedger
+from core.anomaly import apply_anomaly_detection
+from core.exporter import (
+    APPENDIX_COLUMNS,
+    APPENDIX_CHUNK_ROWS,
+    PDF_SPOOL_BYTES,
+    generate_pdf_report
+)
+
+PAGE_PATTERN = re.compile(rb"/Type /Page\b(?!s)")
+
+
+def count_pages(data: bytes) -> int:
+    # Page objects are not compressed, only their content streams
+    return len(PAGE_PATTERN.findall(data))
+
+
+def naive_appendix(df: pd.DataFrame) -> float:
+    from reportlab.lib import pagesizes
+    from reportlab.platypus import SimpleDocTemplate, Table
+
+    started = time.perf_counter()
+
+    data = [[title for _, title, _ in APPENDIX_COLUMNS]]
+    for _, row in df.iterrows():
+        data.append([
+            str(row["date"]),
+            row["description"],
+            row["category"],
+            f"{row['amount']:,.2f}",
+            row["anomaly_reason"],
+        ])
+
+    doc = SimpleDocTemplate(io.BytesIO(), pagesize=pagesizes.A4)
+    doc.build([Table(data, repeatRows=1)])
+
+    return time.perf_counter() - started
+
+
+def timed_report(df, trace_memory: bool, **options):
+    if trace_memory:
+        tracemalloc.start()
+
+    with tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_BYTES) as output:
+        started = time.perf_counter()
+        generate_pdf_report(df, output=output, **options)
+        seconds = time.perf_counter() - started
+
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+        spilled = output._rolled
+        output.seek(0)
+        data = output.read()
+
+    return seconds, peak, count_pages(data), len(data), spilled
+
+
+def check_memory(df, max_pages: int, chunk_rows: int, page_budget_kib: float):
+    from core.report import build_report
+
+    report = build_report(df)
+    _, base_peak, base_pages, _, _ = timed_report(df, True, report=report)
+    _, peak, pages, _, _ = timed_report(
+        df, True, report=report, appendix="all", max_pages=max_pages, chunk_rows=chunk_rows
+    )
+
+    appendix_pages = pages - base_pages
+    growth = peak - base_peak
+    budget = max_pages * page_budget_kib * 1024
+    print(
+        f"appendix of {appendix_pages:,} pages for {len(df):,} rows: peak +{growth / 2 ** 20:.1f} MiB "
+        f"({growth / max(appendix_pages, 1) / 1024:.1f} KiB per page, "
+        f"budget {budget / 2 ** 20:.1f} MiB for {max_pages:,} pages)"
+    )
+
+    failures = []
+    if appendix_pages > max_pages + 1:
+        failures.append(f"{appendix_pages:,} appendix pages, limit {max_pages:,}")
+    if growth > budget:
+        failures.append(f"appendix peak +{growth / 2 ** 20:.1f} MiB is over the {budget / 2 ** 20:.1f} MiB budget")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+    print("OK")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PDF report appendix timing")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--appendix", choices=["flagged", "all"], default="all")
+    parser.add_argument("--max-pages", type=int, default=5000)
+    parser.add_argument("--chunk-rows", type=int, default=APPENDIX_CHUNK_ROWS)
+    parser.add_argument("--trace-memory", action="store_true")
+    parser.add_argument("--naive", action="store_true")
+    parser.add_argument("--check-memory", action="store_true")
+    parser.add_argument("--page-budget-kib", type=float, default=40.0)
+    args = parser.parse_args()
+
+    ledger = pd.concat(GeneratedLedger(args.rows, 50_000)).reset_index(drop=True)
+    df = apply_anomaly_detection(ledger, inplace=True)
+
+    listed = int(df["anomaly_flag"].sum()) if args.appendix == "flagged" else len(df)
+    print(f"{args.rows:,} rows, appendix={args.appendix} ({listed:,} rows listed)")
+
+    # Warm-up: reportlab / matplotlib imports, fonts, and this frame's
+    # charts in the chart cache, so the runs differ only by the appendix
+    generate_pdf_report(df)
+
+    print(f"{'':<10} {'seconds':>8} {'pages':>7} {'size MiB':>9} {'peak MiB':>9}  spilled")
+
+    runs = [
+        ("report", {}),
+        ("appendix", {
+            "appendix": args.appendix,
+            "max_pages": args.max_pages,
+            "chunk_rows": args.chunk_rows,
+        }),
+    ]
+    for label, options in runs:
+        seconds, peak, pages, size, spilled = timed_report(df, args.trace_memory, **options)
+        peak_text = f"{peak / 2 ** 20:9.1f}" if peak is not None else f"{'-':>9}"
+        print(f"{label:<10} {seconds:8.2f} {pages:7d} {size / 2 ** 20:9.1f} {peak_text}  {spilled}")
+
+    if args.check_memory:
+        check_memory(df, args.max_pages, args.chunk_rows, args.page_budget_kib)
+
+    if args.naive:
+        subset = df[df["anomaly_flag"]] if args.appendix == "flagged" else df
+        print(f"{'iterrows':<10} {naive_appendix(subset):8.2f}  (plain Table, appendix rows only)")
+
+
+if __name__ == "__main__":
+    main()
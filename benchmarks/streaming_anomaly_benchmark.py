@@ -0,0 +1,175 @@
+"""
+Checks the two-pass streaming anomaly detector against the in-memory
+apply_anomaly_detection and compares time and peak traced memory.
+
+    python -m benchmarks.streaming_anomaly_benchmark
+    python -m benchmarks.streaming_anomaly_benchmark --rows 2000000 --chunk-rows 100000
+    python -m benchmarks.streaming_anomaly_benchmark --ledger-near-duplicates
+
+Chunks are generated on the fly from a seed, so the streaming run never
+holds more than one chunk of input; only its (small) output summary is
+kept. Use --skip-check for sizes the in-memory path cannot handle.
+
+A small CSV whose chunks infer different dtypes (whole-number amounts as
+int64 in one chunk, decimals as float64 in the next) checks that exact
+duplicates are still matched across chunks. Exits with code 1 on any
+mismatch with the in-memory path, or if the streaming peak is not below
+the in-memory peak. Near duplicates are matched within chunks unless
+--ledger-near-duplicates is given, so by default the check only requires
+the streamed near-duplicate flags to be a subset of the in-memory ones
+(and skips the memory assertion in ledger mode, whose index is larger
+than the in-memory path's working set).
+"""
+
+import io
+import sys
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from core.anomaly import apply_anomaly_detection
+from core.ingest import ChunkedCSVReader
+from core.streaming_anomaly import stream_anomaly_detection
+
+
+class GeneratedLedger:
+    """Re-iterable source of categorized chunks, identical on every pass."""
+
+    def __init__(self, rows: int, chunk_rows: int, categories: int = 300, seed: int = 0):
+        self.rows = rows
+        self.chunk_rows = chunk_rows
+        self.categories = np.array([f"Category {i:04d}" for i in range(categories)], dtype=object)
+        self.vendors = np.array([f"Vendor {i:05d}" for i in range(20_000)], dtype=object)
+        self.seed = seed
+
+    def __iter__(self):
+        weights = 1.0 / np.arange(1, len(self.categories) + 1)
+        weights /= weights.sum()
+
+        for number, start in enumerate(range(0, self.rows, self.chunk_rows)):
+            rng = np.random.default_rng([self.seed, number])
+            n = min(self.chunk_rows, self.rows - start)
+
+            yield pd.DataFrame({
+                "date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D"),
+                # Rounded amounts and a bounded vendor list make real duplicates
+                "amount": (rng.gamma(2.0, 1500.0, n) // 10 * 10),
+                "description": self.vendors[rng.integers(0, len(self.vendors), n)],
+                "category": self.categories[rng.choice(len(self.categories), size=n, p=weights)],
+            }, index=pd.RangeIndex(start, start + n))
+
+
+def traced(func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+# Two chunks of 3 rows: the first reads amounts as int64, the second as
+# float64, and its first row repeats the first chunk's first row
+MIXED_DTYPE_CSV = """date,amount,description,category
+2024-01-01,500,Vendor A,Travel
+2024-01-02,700,Vendor B,Meals
+2024-01-03,900,Vendor C,Travel
+2024-01-01,500.0,Vendor A,Travel
+2024-01-05,12.5,Vendor D,Meals
+2024-01-06,40.25,Vendor E,Travel
+"""
+
+
+def compare(streamed: pd.DataFrame, reference: pd.DataFrame, failures, label: str, ledger_near: bool):
+    np.testing.assert_allclose(
+        streamed["category_zscore"].to_numpy(),
+        reference["category_zscore"].to_numpy(),
+        rtol=1e-9,
+        atol=1e-12
+    )
+    # Within-chunk matching can only miss near duplicates, never add one;
+    # rows it misses may also lose their anomaly flag
+    exact = ledger_near | ~reference["near_duplicate_flag"].to_numpy()
+    for column in ["high_absolute_flag", "duplicate_flag", "near_duplicate_flag", "anomaly_flag"]:
+        got = streamed[column].to_numpy()
+        want = reference[column].to_numpy()
+        if column == "near_duplicate_flag" and not ledger_near:
+            mismatches = int((got & ~want).sum())
+            missed = int((want & ~got).sum())
+            print(f"{label:<12} {column:<20} mismatches: {mismatches} (missed across chunks: {missed})")
+        else:
+            mismatches = int((got != want)[exact].sum())
+            print(f"{label:<12} {column:<20} mismatches: {mismatches}")
+        if mismatches:
+            failures.append(f"{label}: {mismatches} {column} mismatches")
+
+
+def check_mixed_dtypes(failures, ledger_near: bool):
+    source = ChunkedCSVReader(io.BytesIO(MIXED_DTYPE_CSV.encode()), chunk_rows=3, engine="pandas")
+    streamed = pd.concat(list(stream_anomaly_detection(source, ledger_near_duplicates=ledger_near)))
+    reference = apply_anomaly_detection(pd.concat(list(source)))
+    compare(streamed, reference, failures, "mixed dtype", ledger_near)
+
+    if not streamed["duplicate_flag"].any():
+        failures.append("mixed dtype: duplicate across chunks not flagged")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming vs in-memory anomaly detection")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--skip-check", action="store_true")
+    parser.add_argument("--ledger-near-duplicates", action="store_true")
+    args = parser.parse_args()
+
+    ledger_near = args.ledger_near_duplicates
+    failures = []
+    check_mixed_dtypes(failures, ledger_near)
+
+    source = GeneratedLedger(args.rows, args.chunk_rows)
+
+    def streaming():
+        flags = []
+        for chunk in stream_anomaly_detection(source, ledger_near_duplicates=ledger_near):
+            flags.append(chunk[[
+                "category_zscore", "high_absolute_flag", "duplicate_flag",
+                "near_duplicate_flag", "anomaly_flag"
+            ]])
+        return pd.concat(flags)
+
+    streamed, stream_seconds, stream_peak = traced(streaming)
+    print(f"streaming : {stream_seconds:8.2f} s  peak {stream_peak / 2 ** 20:8.1f} MiB")
+
+    if args.skip_check:
+        return
+
+    full = pd.concat(source)
+    reference, memory_seconds, memory_peak = traced(lambda: apply_anomaly_detection(full, inplace=True))
+    print(f"in-memory : {memory_seconds:8.2f} s  peak {memory_peak / 2 ** 20:8.1f} MiB (excluding input)")
+
+    compare(streamed, reference, failures, "generated", ledger_near)
+
+    if stream_peak >= memory_peak:
+        message = (
+            f"streaming peak {stream_peak / 2 ** 20:.1f} MiB is not below "
+            f"the in-memory peak {memory_peak / 2 ** 20:.1f} MiB"
+        )
+        if ledger_near:
+            print(f"note: {message} (expected with --ledger-near-duplicates)")
+        else:
+            failures.append(message)
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 import pandas as pd
 import numpy as np
 
+from core.preprocessing import merchant_key
+
+# Columns that must all match for a transaction to count as a duplicate
+DUPLICATE_SUBSET = ["date", "amount", "description"]
+
 
 # def detect_global_outliers(df: pd.DataFrame):
 #     df = df.copy()
@@ -15,8 +20,9 @@ import numpy as np
 
 #     return df
 
-def detect_high_absolute_amount(df: pd.DataFrame):
-    df = df.copy()
+def detect_high_absolute_amount(df: pd.DataFrame, inplace: bool = False):
+    if not inplace:
+        df = df.copy()
 
     global_mean = df["amount"].mean()
     global_std = df["amount"].std()
@@ -32,42 +38,215 @@ def detect_high_absolute_amount(df: pd.DataFrame):
     return df
 
 
-def detect_category_outliers(df: pd.DataFrame, z_threshold: float = 2.5):
-    df = df.copy()
-    df["category_zscore"] = 0.0
-    df["category_outlier_flag"] = False
-
-    for category in df["category"].unique():
-        subset = df[df["category"] == category]
-
-        if len(subset) < 5:
-            continue
-
-        mean = subset["amount"].mean()
-        std = subset["amount"].std()
-
-        if std == 0:
-            continue
-
-        z_scores = (subset["amount"] - mean) / std
-
-        df.loc[subset.index, "category_zscore"] = z_scores
-        df.loc[subset.index, "category_outlier_flag"] = z_scores.abs() > z_threshold
+def group_moments(codes: np.ndarray, amount: np.ndarray, n_groups: int):
+    """
+    Per-group row counts, non-missing counts, means and sums of squared
+    deviations (M2) in one bincount pass. Rows with code -1 belong to no
+    group. Also returns one sample amount per group and whether any amount
+    in the group differs from it, so constant groups can be detected
+    exactly. deviation is each row's amount minus its group mean.
+    """
+    labelled = codes >= 0
+    group = np.where(labelled, codes, 0)
+    n_groups = max(n_groups, 1)
+
+    present = labelled & ~np.isnan(amount)
+    values = np.where(present, amount, 0.0)
+
+    counts = np.bincount(group, weights=labelled, minlength=n_groups)
+    n_valid = np.bincount(group, weights=present, minlength=n_groups)
+    sums = np.bincount(group, weights=values, minlength=n_groups)
+
+    # Any one present amount per category; a category whose amounts all
+    # equal it is constant and must get std == 0 regardless of rounding
+    rows = np.flatnonzero(present)
+    sample = np.full(n_groups, np.nan)
+    sample[group[rows]] = amount[rows]
+    varies = np.bincount(
+        group,
+        weights=present & (amount != sample[group]),
+        minlength=n_groups
+    ) > 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / n_valid
+
+        # Two-pass variance (mean first, then squared deviations) as in Series.std
+        deviation = amount - means[group]
+        m2 = np.bincount(group, weights=np.where(present, deviation ** 2, 0.0), minlength=n_groups)
+
+    return {
+        "counts": counts,
+        "n_valid": n_valid,
+        "means": means,
+        "m2": m2,
+        "sample": sample,
+        "varies": varies,
+        "deviation": deviation,
+    }
+
+
+def moments_std(n_valid, m2, varies):
+    # Sample std (ddof=1); exactly 0 for constant groups, NaN below 2 values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        std = np.where(n_valid > 1, np.sqrt(m2 / (n_valid - 1)), np.nan)
+    return np.where(varies | np.isnan(std), std, 0.0)
+
+
+def category_zscores(categories: pd.Series, amounts: pd.Series, min_count: int = 5):
+    """
+    Per-row z-score of amount within its category, computed for every
+    category in one grouped pass (factorize + bincount segment sums).
+
+    Categories with fewer than `min_count` rows, or whose std is exactly
+    zero, get a z-score of 0. Rows with a missing category also get 0.
+    """
+    codes, uniques = pd.factorize(categories)
+    amount = amounts.to_numpy(dtype=float)
+
+    labelled = codes >= 0
+    group = np.where(labelled, codes, 0)
+
+    moments = group_moments(codes, amount, len(uniques))
+    std = moments_std(moments["n_valid"], moments["m2"], moments["varies"])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eligible = (moments["counts"] >= min_count) & (std != 0)
+        scored = labelled & eligible[group]
+        z_scores = np.where(scored, moments["deviation"] / std[group], 0.0)
+
+    return z_scores
+
+
+def detect_category_outliers(
+    df: pd.DataFrame,
+    z_threshold: float = 2.5,
+    inplace: bool = False,
+    baseline=None,
+    upload_id: str = None
+):
+    if not inplace:
+        df = df.copy()
+
+    if baseline is None:
+        z_scores = category_zscores(df["category"], df["amount"])
+    else:
+        # Historical statistics (core.baseline.CategoryBaseline) plus this file
+        moments = baseline.scoring_moments(df, upload_id=upload_id)
+        z_scores = moments.zscores(df["category"], df["amount"])
+
+    df["category_zscore"] = z_scores
+    df["category_outlier_flag"] = np.abs(z_scores) > z_threshold
 
     return df
 
-def detect_duplicates(df: pd.DataFrame):
-    df = df.copy()
+def detect_duplicates(df: pd.DataFrame, inplace: bool = False):
+    if not inplace:
+        df = df.copy()
 
     df["duplicate_flag"] = df.duplicated(
-        subset=["date", "amount", "description"],
+        subset=DUPLICATE_SUBSET,
         keep="first"
     )
 
     return df
 
-def generate_anomaly_explanations(df: pd.DataFrame):
-    df = df.copy()
+def near_duplicate_mask(
+    keys,
+    amounts,
+    dates,
+    window_days: float = 1,
+    amount_tolerance: float = 1.0
+) -> np.ndarray:
+    """
+    True for each row that has an earlier row (by date, then position)
+    with the same key, an amount within amount_tolerance and a date at
+    most window_days before it.
+
+    Rows are sorted by (key, amount bucket, date) and each row is compared
+    only with its predecessors in the same run, stepping back until the
+    date window is exhausted. Buckets are 2 * amount_tolerance wide; the
+    pass is repeated on a grid shifted by half a bucket, so any two
+    amounts within tolerance share a bucket in at least one of them.
+    Cost is O(n log n) for the sorts plus O(n) per step back, and the
+    number of steps is bounded by the largest same-merchant, same-amount
+    burst inside one window.
+    """
+    codes, _ = pd.factorize(pd.Series(keys))
+    amount = np.asarray(amounts, dtype=float)
+    day = pd.to_datetime(pd.Series(dates)).to_numpy("datetime64[ns]").astype("int64")
+    window = int(window_days * 86_400 * 1_000_000_000)
+
+    n = len(amount)
+    flagged = np.zeros(n, dtype=bool)
+    if n < 2:
+        return flagged
+
+    width = 2 * amount_tolerance if amount_tolerance > 0 else None
+    position = np.arange(n)
+
+    for shift in ((0.0, 0.5) if width else (0.0,)):
+        if width:
+            bucket = np.floor(amount / width + shift)
+        else:
+            bucket = amount
+
+        order = np.lexsort((position, day, bucket, codes))
+        k, b, d, a = codes[order], bucket[order], day[order], amount[order]
+
+        step = 1
+        # Rows still able to reach an in-window predecessor of the same run
+        active = np.arange(step, n)
+        while len(active):
+            prev = active - step
+            same_run = (k[active] == k[prev]) & (b[active] == b[prev]) & (k[active] >= 0)
+            in_window = d[active] - d[prev] <= window
+            alive = same_run & in_window
+
+            match = alive & (np.abs(a[active] - a[prev]) <= amount_tolerance)
+            flagged[order[active[match]]] = True
+
+            active = active[alive & ~match]
+            step += 1
+            active = active[active >= step]
+
+    return flagged
+
+
+def detect_near_duplicates(
+    df: pd.DataFrame,
+    window_days: float = 1,
+    amount_tolerance: float = 1.0,
+    inplace: bool = False
+):
+    """
+    Flags likely double billing: same merchant (descriptions compared with
+    reference numbers and punctuation stripped), amount within
+    amount_tolerance and posted within window_days of an earlier charge.
+    Exact duplicates are left to duplicate_flag.
+    """
+    if not inplace:
+        df = df.copy()
+
+    near = near_duplicate_mask(
+        merchant_key(df["description"]),
+        df["amount"],
+        df["date"],
+        window_days=window_days,
+        amount_tolerance=amount_tolerance
+    )
+
+    if "duplicate_flag" in df.columns:
+        near &= ~df["duplicate_flag"].to_numpy(dtype=bool)
+
+    df["near_duplicate_flag"] = near
+
+    return df
+
+
+def generate_anomaly_explanations(df: pd.DataFrame, inplace: bool = False):
+    if not inplace:
+        df = df.copy()
     df["anomaly_reason"] = ""
 
     df.loc[df["category_outlier_flag"], "anomaly_reason"] += \
@@ -76,21 +255,37 @@ def generate_anomaly_explanations(df: pd.DataFrame):
     df.loc[df["duplicate_flag"], "anomaly_reason"] += \
         "Potential duplicate transaction detected. "
 
+    if "near_duplicate_flag" in df.columns:
+        df.loc[df["near_duplicate_flag"], "anomaly_reason"] += \
+            "Similar charge from the same merchant shortly before (possible double billing). "
+
     df.loc[df["high_absolute_flag"], "anomaly_reason"] += \
         "Transaction amount is significantly high compared to overall spending. "
 
     return df
 
-def apply_anomaly_detection(df: pd.DataFrame):
-    df = detect_category_outliers(df)
-    df = detect_high_absolute_amount(df)
-    df = detect_duplicates(df)
+def apply_anomaly_detection(
+    df: pd.DataFrame,
+    inplace: bool = False,
+    baseline=None,
+    upload_id: str = None
+):
+    # One copy up front (none with inplace=True); each stage then only
+    # allocates the columns it adds
+    if not inplace:
+        df = df.copy()
+
+    df = detect_category_outliers(df, inplace=True, baseline=baseline, upload_id=upload_id)
+    df = detect_high_absolute_amount(df, inplace=True)
+    df = detect_duplicates(df, inplace=True)
+    df = detect_near_duplicates(df, inplace=True)
 
     df["anomaly_flag"] = (
         df["category_outlier_flag"] |
-        df["duplicate_flag"]
+        df["duplicate_flag"] |
+        df["near_duplicate_flag"]
     )
 
-    df = generate_anomaly_explanations(df)
+    df = generate_anomaly_explanations(df, inplace=True)
 
     return df
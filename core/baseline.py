@@ -0,0 +1,348 @@
+"""
+Persisted per-category amount statistics (count, mean, M2) built up
+across uploads, so a new file can be scored against history.
+
+    python -m core.baseline show
+    python -m core.baseline reset
+    python -m core.baseline rebuild data/2024-*.csv --half-life-days 180
+"""
+
+import os
+import time
+import hashlib
+import sqlite3
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from core.sqlite_util import Transaction
+from core.streaming_anomaly import GroupedMoments
+
+DEFAULT_BASELINE_PATH = os.getenv(
+    "ANOMALY_BASELINE_PATH",
+    os.path.join(".cache", "anomaly_baseline.sqlite3")
+)
+
+
+class CategoryBaseline:
+    """
+    Running per-category statistics stored in SQLite under a baseline name.
+
+    merge() folds an upload into the stored statistics with Chan's merge,
+    so the cost is proportional to the new rows only. Each upload id is
+    merged at most once, which makes re-processing the same file safe.
+
+    With half_life_days set, stored weights (count and M2) are halved for
+    every half_life_days between the newest transaction date already in
+    the baseline and the newest date of the incoming data. Decay is per
+    upload, not per row: all rows of one upload get the same weight.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_BASELINE_PATH,
+        name: str = "default",
+        half_life_days: float = None
+    ):
+        self.path = path
+        self.name = name
+        self.half_life_days = half_life_days
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS category_baseline (
+                    name TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    rows REAL NOT NULL,
+                    count REAL NOT NULL,
+                    mean REAL NOT NULL,
+                    m2 REAL NOT NULL,
+                    sample REAL,
+                    varies INTEGER NOT NULL,
+                    PRIMARY KEY (name, category)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS baseline_uploads (
+                    name TEXT NOT NULL,
+                    upload_id TEXT NOT NULL,
+                    rows INTEGER NOT NULL,
+                    as_of TEXT,
+                    merged_at REAL NOT NULL,
+                    PRIMARY KEY (name, upload_id)
+                )
+                """
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        return Transaction(conn)
+
+    # --- reading -------------------------------------------------------
+
+    def _load(self, conn):
+        rows = conn.execute(
+            """
+            SELECT category, rows, count, mean, m2, sample, varies
+            FROM category_baseline WHERE name = ?
+            """,
+            (self.name,)
+        ).fetchall()
+
+        moments = GroupedMoments()
+        if rows:
+            categories, n_rows, count, mean, m2, sample, varies = zip(*rows)
+            moments._merge_at(
+                moments._positions_for(list(categories)),
+                np.array(n_rows, dtype=float),
+                np.array(count, dtype=float),
+                np.array(mean, dtype=float),
+                np.array(m2, dtype=float),
+                np.array(sample, dtype=float),
+                np.array(varies, dtype=bool)
+            )
+
+        as_of = conn.execute(
+            "SELECT MAX(as_of) FROM baseline_uploads WHERE name = ?",
+            (self.name,)
+        ).fetchone()[0]
+
+        return moments, pd.Timestamp(as_of) if as_of else None
+
+    def moments(self) -> GroupedMoments:
+        with self._connect() as conn:
+            moments, _ = self._load(conn)
+        return moments
+
+    def has_upload(self, upload_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM baseline_uploads WHERE name = ? AND upload_id = ?",
+                (self.name, upload_id)
+            ).fetchone()
+        return row is not None
+
+    def _decay(self, moments, as_of, until):
+        if not self.half_life_days or as_of is None or until is None or until <= as_of:
+            return moments
+
+        days = (until - as_of) / pd.Timedelta(days=1)
+        return moments.scale(0.5 ** (days / self.half_life_days))
+
+    def scoring_moments(self, df: pd.DataFrame, upload_id: str = None) -> GroupedMoments:
+        """
+        Baseline statistics with df's own rows included (unless this
+        upload was already merged), ready for GroupedMoments.zscores.
+        """
+        with self._connect() as conn:
+            moments, as_of = self._load(conn)
+            merged = upload_id is not None and conn.execute(
+                "SELECT 1 FROM baseline_uploads WHERE name = ? AND upload_id = ?",
+                (self.name, upload_id)
+            ).fetchone() is not None
+
+        if merged:
+            return moments
+
+        moments = self._decay(moments, as_of, _latest_date(df))
+        return moments.update(df["category"], df["amount"])
+
+    # --- writing -------------------------------------------------------
+
+    def merge_moments(self, new: GroupedMoments, rows: int, as_of=None, upload_id: str = None) -> bool:
+        """
+        Folds precomputed moments into the stored baseline. Returns False
+        if upload_id was merged before (nothing is changed).
+        """
+        upload_id = upload_id or f"upload-{time.time_ns()}"
+
+        with self._connect() as conn:
+            # Take the write lock before reading so concurrent merges serialize
+            conn.execute("BEGIN IMMEDIATE")
+
+            if conn.execute(
+                "SELECT 1 FROM baseline_uploads WHERE name = ? AND upload_id = ?",
+                (self.name, upload_id)
+            ).fetchone():
+                return False
+
+            moments, stored_as_of = self._load(conn)
+            moments = self._decay(moments, stored_as_of, as_of).merge(new)
+
+            conn.execute("DELETE FROM category_baseline WHERE name = ?", (self.name,))
+            conn.executemany(
+                """
+                INSERT INTO category_baseline
+                (name, category, rows, count, mean, m2, sample, varies)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        self.name, str(category), float(moments.rows[i]),
+                        float(moments.count[i]), float(moments.mean[i]), float(moments.m2[i]),
+                        None if np.isnan(moments.sample[i]) else float(moments.sample[i]),
+                        int(moments.varies[i])
+                    )
+                    for i, category in enumerate(moments.keys)
+                ]
+            )
+            conn.execute(
+                """
+                INSERT INTO baseline_uploads (name, upload_id, rows, as_of, merged_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    self.name, upload_id, int(rows),
+                    as_of.isoformat() if as_of is not None else None,
+                    time.time()
+                )
+            )
+
+        return True
+
+    def merge(self, df: pd.DataFrame, upload_id: str = None) -> bool:
+        moments = GroupedMoments().update(df["category"], df["amount"])
+        return self.merge_moments(moments, len(df), _latest_date(df), upload_id)
+
+    def reset(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM category_baseline WHERE name = ?", (self.name,))
+            conn.execute("DELETE FROM baseline_uploads WHERE name = ?", (self.name,))
+
+    def summary(self) -> pd.DataFrame:
+        moments = self.moments()
+        return pd.DataFrame({
+            "category": moments.keys,
+            "weight": moments.rows,
+            "mean": moments.mean,
+            "std": moments.std(),
+        })
+
+    def uploads(self) -> pd.DataFrame:
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT upload_id, rows, as_of, merged_at FROM baseline_uploads
+                WHERE name = ? ORDER BY merged_at
+                """,
+                (self.name,)
+            ).fetchall()
+        return pd.DataFrame(rows, columns=["upload_id", "rows", "as_of", "merged_at"])
+
+
+def _latest_date(df: pd.DataFrame):
+    if "date" not in df.columns or not len(df):
+        return None
+    latest = df["date"].max()
+    return None if pd.isna(latest) else pd.Timestamp(latest)
+
+
+def file_digest(path: str) -> str:
+    # Same id the app uses for an uploaded file (sha256 of its bytes)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2 ** 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_chunks(path: str):
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches():
+            yield batch.to_pandas()
+    elif path.endswith((".arrow", ".feather")):
+        import pyarrow as pa
+        import pyarrow.ipc as pa_ipc
+        with pa.memory_map(path) as source:
+            reader = pa_ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i).to_pandas()
+    else:
+        from core.ingest import stream_csv
+        yield from stream_csv(path)
+
+
+def rebuild(baseline: CategoryBaseline, paths):
+    """
+    Resets the baseline and merges the given files in order. Every chunk
+    gets the upload cleaning first (rows with an invalid date, amount or
+    description are dropped), so Parquet / Arrow files are held to the
+    same rules as CSV. Files without a category column (raw uploads) are
+    then categorized; processed exports keep their categories.
+    """
+    from core.preprocessing import DROP_RULES, guess_date_format, preprocess_with_report
+
+    baseline.reset()
+
+    for path in paths:
+        moments = GroupedMoments()
+        rows = 0
+        as_of = None
+        dropped = dict.fromkeys(DROP_RULES, 0)
+        format_known = False
+        date_format = None
+
+        for chunk in _file_chunks(path):
+            chunk.columns = chunk.columns.str.lower().str.strip()
+
+            if not format_known:
+                format_known, date_format = guess_date_format(chunk["date"])
+
+            chunk, chunk_dropped = preprocess_with_report(chunk, inplace=True, date_format=date_format)
+            for rule, count in chunk_dropped.items():
+                dropped[rule] += count
+
+            if not len(chunk):
+                continue
+
+            if "category" not in chunk.columns:
+                from core.categorizer import categorize_dataframe
+                chunk = categorize_dataframe(chunk, inplace=True)
+
+            moments.update(chunk["category"], chunk["amount"])
+            rows += len(chunk)
+
+            latest = _latest_date(chunk)
+            if latest is not None and (as_of is None or latest > as_of):
+                as_of = latest
+
+        baseline.merge_moments(moments, rows, as_of, upload_id=file_digest(path))
+        skipped = ", ".join(f"{count} {rule}" for rule, count in dropped.items() if count)
+        print(f"Merged {rows} rows from {path}" + (f" (dropped {skipped})" if skipped else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the historical anomaly baseline")
+    parser.add_argument("command", choices=["show", "reset", "rebuild"])
+    parser.add_argument("files", nargs="*", help="files to rebuild from, oldest first")
+    parser.add_argument("--path", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument("--name", default="default")
+    parser.add_argument("--half-life-days", type=float, default=None)
+    args = parser.parse_args()
+
+    baseline = CategoryBaseline(args.path, name=args.name, half_life_days=args.half_life_days)
+
+    if args.command == "reset":
+        baseline.reset()
+        print(f"Baseline '{args.name}' reset")
+    elif args.command == "rebuild":
+        if not args.files:
+            parser.error("rebuild needs at least one file")
+        rebuild(baseline, args.files)
+    else:
+        print(baseline.summary().to_string(index=False))
+        print()
+        print(baseline.uploads().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
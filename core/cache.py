@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+from config.categories import CATEGORIES, CATEGORY_DESCRIPTIONS
+from llm.groq_client import GROQ_MODEL
+from core.sqlite_util import Transaction
+
+DEFAULT_CACHE_PATH = os.getenv(
+    "CATEGORY_CACHE_PATH",
+    os.path.join(".cache", "category_cache.sqlite3")
+)
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_CHUNK = 500
+
+
+def config_fingerprint(model: str = GROQ_MODEL) -> str:
+    payload = json.dumps(
+        {
+            "categories": CATEGORIES,
+            "descriptions": CATEGORY_DESCRIPTIONS,
+            "model": model,
+        },
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class CategoryCache:
+    """
+    Persistent description -> (category, confidence) store for LLM results.
+
+    Entries are keyed by normalized description and scoped to a fingerprint
+    of the category config and model, so changing either invalidates old
+    answers. The store is bounded by entry count (least recently used rows
+    are evicted first) and by age.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = 100_000,
+        max_age_days: float = 90,
+        model: str = GROQ_MODEL
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.fingerprint = config_fingerprint(model)
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS category_cache (
+                    fingerprint TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    confidence REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (fingerprint, description)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_category_cache_last_used "
+                "ON category_cache (last_used)"
+            )
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        return Transaction(conn)
+
+    def get_many(self, descriptions):
+        """
+        descriptions: iterable of normalized descriptions
+        Returns {description: (category, confidence)} for the cached ones.
+        """
+        keys = list(dict.fromkeys(descriptions))
+        if not keys:
+            return {}
+
+        now = time.time()
+        oldest = now - self.max_age_seconds
+        found = {}
+
+        with self._connect() as conn:
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+
+                rows = conn.execute(
+                    f"""
+                    SELECT description, category, confidence
+                    FROM category_cache
+                    WHERE fingerprint = ? AND created_at >= ?
+                    AND description IN ({placeholders})
+                    """,
+                    [self.fingerprint, oldest, *chunk]
+                ).fetchall()
+
+                for description, category, confidence in rows:
+                    found[description] = (category, confidence)
+
+            if found:
+                conn.executemany(
+                    "UPDATE category_cache SET last_used = ? "
+                    "WHERE fingerprint = ? AND description = ?",
+                    [(now, self.fingerprint, desc) for desc in found]
+                )
+
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, items):
+        """
+        items: iterable of (normalized description, category, confidence)
+        """
+        now = time.time()
+        rows = [
+            (self.fingerprint, desc, category, float(confidence), now, now)
+            for desc, category, confidence in items
+        ]
+        if not rows:
+            return
+
+        with self._connect() as conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO category_cache
+                (fingerprint, description, category, confidence, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute(
+            "DELETE FROM category_cache WHERE created_at < ?",
+            (now - self.max_age_seconds,)
+        )
+
+        count = conn.execute("SELECT COUNT(*) FROM category_cache").fetchone()[0]
+        overflow = count - self.max_entries
+
+        if overflow > 0:
+            conn.execute(
+                """
+                DELETE FROM category_cache WHERE rowid IN (
+                    SELECT rowid FROM category_cache
+                    ORDER BY last_used ASC LIMIT ?
+                )
+                """,
+                (overflow,)
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM category_cache")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM category_cache").fetchone()[0]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+
+_default_cache = None
+
+
+def get_default_cache() -> CategoryCache:
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CategoryCache()
+    return _default_cache
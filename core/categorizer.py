@@ -1,10 +1,20 @@
 from config.categories import CATEGORIES
 
 import json
+import threading
+from functools import partial
+
+import numpy as np
 import pandas as pd
 from llm.prompt_builder import build_batch_prompt
-from llm.groq_client import call_groq
-from llm.schemas import BatchCategorization
+from llm.groq_client import GroqAPIError, GroqRateLimitError, call_groq, stream_groq
+from llm.stream_parser import IncrementalResultParser
+from llm.concurrency import AdaptiveConcurrency, dispatch_batches
+from llm.batching import BatchPlanner
+from llm.retry import RetryPolicy, RetryStats, categorize_with_retry
+from core.matcher import KeywordMatcher, get_matcher
+from core.cache import CategoryCache, get_default_cache
+from core.preprocessing import normalize_description
 
 
 # Merchant keyword mapping
@@ -19,73 +29,225 @@ RULE_BASED_KEYWORDS = {
     "Healthcare": ["apollo", "pharmacy"]
 }
 
-def rule_based_categorize(description: str):
-    desc_lower = description.lower()
+# Built once, so the per-description path never touches the keyword list
+DEFAULT_MATCHER = KeywordMatcher(RULE_BASED_KEYWORDS)
+
+
+def _matcher_for(keywords: dict = None):
+    return DEFAULT_MATCHER if keywords is None else get_matcher(keywords)
 
-    for category, keywords in RULE_BASED_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in desc_lower:
-                return category, 1.0  # Full confidence
+
+def rule_based_categorize(description: str, keywords: dict = None):
+    matcher = _matcher_for(keywords)
+    category = matcher.match(description)
+
+    if category:
+        return category, 1.0  # Full confidence
 
     return None, 0.0
 
-def llm_batch_categorize(batch_items):
+
+def rule_based_categorize_series(descriptions: pd.Series, keywords: dict = None):
+    matcher = _matcher_for(keywords)
+    categories = matcher.match_series(descriptions)
+
+    confidence = categories.notna().astype(float)
+
+    return categories, confidence
+
+def _validate_result(item, batch_items):
+    # pydantic loads with the first LLM answer, not with the app
+    from llm.schemas import SingleCategorization
+
+    try:
+        result = SingleCategorization(**item)
+    except Exception as e:
+        print("LLM Parsing Error:", e)
+        return None
+
+    # The prompt uses per-batch ordinals; map them back to our ids
+    if 0 <= result.id < len(batch_items):
+        return result.model_copy(update={"id": batch_items[result.id][0]})
+
+    return None
+
+
+def llm_batch_categorize(batch_items, on_headers=None):
     prompt = build_batch_prompt(batch_items)
-    response = call_groq(prompt)
+    response = call_groq(prompt, on_headers=on_headers)
 
     try:
-        parsed = json.loads(response)
-        validated = BatchCategorization(**parsed)
-        return validated.results
+        items = json.loads(response)["results"]
     except Exception as e:
         print("LLM Parsing Error:", e)
         return []
 
+    # Validate item by item so one bad entry doesn't discard the batch;
+    # whatever is missing gets resubmitted by the retry loop.
+    results = []
 
-def hybrid_categorize(description: str):
-    category, confidence = rule_based_categorize(description)
+    for item in items:
+        result = _validate_result(item, batch_items)
+        if result is not None:
+            results.append(result)
 
-    if category:
-        return category, confidence, "rule_based"
+    return results
 
-    llm_category, llm_confidence = llm_categorize(description)
-    return llm_category, llm_confidence, "llm"
 
+def llm_batch_categorize_stream(batch_items, on_headers=None, on_result=None):
+    """
+    Streaming variant of llm_batch_categorize: each result is validated and
+    handed to on_result as soon as its JSON object is complete.
+    """
+    prompt = build_batch_prompt(batch_items)
+    parser = IncrementalResultParser()
+    results = []
 
-def categorize_dataframe(df: pd.DataFrame, batch_size: int = 20) -> pd.DataFrame:
-    df = df.copy()
-
-    df["category"] = None
-    df["confidence"] = 0.0
-    df["classification_source"] = None
+    try:
+        for fragment in stream_groq(prompt, on_headers=on_headers):
+            for item in parser.feed(fragment):
+                result = _validate_result(item, batch_items)
+                if result is None:
+                    continue
+
+                results.append(result)
+                if on_result is not None:
+                    on_result(result)
+    except GroqRateLimitError:
+        raise
+    except GroqAPIError:
+        # Keep what already arrived; the retry loop resubmits the rest
+        if not results:
+            raise
+        print("LLM Stream Interrupted after", len(results), "results")
+
+    return results
 
-    llm_candidates = []
 
-    # First pass: rule-based
-    for idx, row in df.iterrows():
-        category, confidence = rule_based_categorize(row["description"])
+def hybrid_categorize(description: str):
+    category, confidence = rule_based_categorize(description)
 
-        if category:
-            df.at[idx, "category"] = category
-            df.at[idx, "confidence"] = confidence
-            df.at[idx, "classification_source"] = "rule_based"
-        else:
-            llm_candidates.append((idx, row["description"]))
+    if category:
+        return category, confidence, "rule_based"
 
-    # Batch LLM calls
-    for i in range(0, len(llm_candidates), batch_size):
-        batch = llm_candidates[i:i + batch_size]
+    llm_category, llm_confidence = llm_categorize(description)
+    return llm_category, llm_confidence, "llm"
 
-        results = llm_batch_categorize(batch)
 
-        for result in results:
-            idx = result.id
-            df.at[idx, "category"] = result.category
-            df.at[idx, "confidence"] = result.confidence
-            df.at[idx, "classification_source"] = "llm"
+def _apply_by_description(df, normalized, answers, source):
+    """
+    Writes {normalized description: (category, confidence)} answers onto
+    every row whose normalized description matches. Returns the hit mask
+    aligned to `normalized`.
+    """
+    hit = normalized.isin(answers.keys())
+    values = normalized[hit].map(answers)
+    rows = values.index
+
+    df.loc[rows, "category"] = values.str[0]
+    df.loc[rows, "confidence"] = values.str[1]
+    df.loc[rows, "classification_source"] = source
+
+    return hit
+
+
+def categorize_dataframe(
+    df: pd.DataFrame,
+    batch_size: int = 20,
+    max_in_flight: int = 4,
+    retry_policy: RetryPolicy = None,
+    planner: BatchPlanner = None,
+    use_cache: bool = True,
+    cache: CategoryCache = None,
+    stream: bool = False,
+    progress_callback=None,
+    inplace: bool = False
+) -> pd.DataFrame:
+    if not inplace:
+        df = df.copy()
+
+    # First pass: rule-based, one column at a time
+    categories, confidence = rule_based_categorize_series(df["description"])
+    matched = categories.notna().to_numpy()
+
+    df["category"] = categories
+    df["confidence"] = confidence
+    df["classification_source"] = np.where(matched, "rule_based", None)
+
+    unmatched = df.loc[~matched, "description"]
+    normalized = unmatched.map(normalize_description)
+
+    # Second pass: descriptions already classified by the LLM in earlier runs
+    if use_cache:
+        if cache is None:
+            cache = get_default_cache()
+        cached = cache.get_many(normalized.unique())
+
+        if cached:
+            hit = _apply_by_description(df, normalized, cached, "cache")
+            unmatched = unmatched[~hit]
+            normalized = normalized[~hit]
+
+    # Each distinct description is sent to the LLM once, then fanned out
+    first = ~normalized.duplicated()
+    keys = normalized[first].to_numpy()
+    llm_candidates = list(enumerate(unmatched[first]))
+    answers = {}
+    answers_lock = threading.Lock()
+
+    # Results land here as soon as they are validated (mid-stream when
+    # streaming). Each description belongs to exactly one batch, so the
+    # outcome does not depend on completion order.
+    def record(result):
+        with answers_lock:
+            answers[keys[result.id]] = (result.category, result.confidence)
+            done = len(answers)
+
+        if progress_callback is not None:
+            progress_callback(done, len(keys))
+
+    if stream:
+        categorize_batch = partial(llm_batch_categorize_stream, on_result=record)
+    else:
+        def categorize_batch(batch_items, on_headers=None):
+            results = llm_batch_categorize(batch_items, on_headers=on_headers)
+            for result in results:
+                record(result)
+            return results
+
+    # Batch LLM calls, packed by token budget and dispatched concurrently
+    if planner is None:
+        planner = BatchPlanner(initial_items=batch_size)
+
+    limiter = AdaptiveConcurrency(max_in_flight)
+    stats = RetryStats()
+    run_batch = partial(
+        categorize_with_retry,
+        categorize_batch=categorize_batch,
+        limiter=limiter,
+        policy=retry_policy or RetryPolicy(),
+        stats=stats,
+        on_attempt=planner.record
+    )
+    batch_results = dispatch_batches(
+        planner.plan(llm_candidates),
+        run_batch,
+        max_in_flight=max_in_flight
+    )
+
+    if answers:
+        _apply_by_description(df, normalized, answers, "llm")
+
+        if use_cache:
+            cache.put_many(
+                (key, category, confidence)
+                for key, (category, confidence) in answers.items()
+            )
 
     # Fallback safety
     df["category"] = df["category"].fillna("Other")
     df["classification_source"] = df["classification_source"].fillna("fallback")
 
+    df.attrs["llm_stats"] = {**stats.as_dict(), "batches": len(batch_results)}
+
     return df
@@ -0,0 +1,270 @@
+import io
+import os
+import json
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+
+CHART_STYLE = {
+    "figsize": (6, 4),
+    "dpi": 100,
+    "rotation": 45,
+}
+
+
+def chart_spec(kind: str, x, y, title: str, ylabel: str, fmt: str = "png", **style):
+    """
+    Plain-data description of a chart (picklable, hashable as JSON), so it
+    can be rendered in another process and cached by content.
+    """
+    return {
+        "kind": kind,
+        "x": [str(value) for value in x],
+        "y": [float(value) for value in y],
+        "title": title,
+        "ylabel": ylabel,
+        "format": fmt,
+        "style": {**CHART_STYLE, **style},
+    }
+
+
+def category_chart_spec(category_summary, fmt: str = "png"):
+    return chart_spec(
+        "bar",
+        category_summary["category"],
+        category_summary["amount"],
+        title="Spend by Category",
+        ylabel="Total Spend",
+        fmt=fmt
+    )
+
+
+def monthly_trend_chart_spec(monthly_data, fmt: str = "png"):
+    return chart_spec(
+        "line",
+        monthly_data["month"],
+        monthly_data["amount"],
+        title="Monthly Spend Trend",
+        ylabel="Monthly Spend",
+        fmt=fmt
+    )
+
+
+def chart_key(spec) -> str:
+    payload = json.dumps(spec, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_chart(spec) -> bytes:
+    """
+    Draws on a standalone Figure with its own Agg canvas. Nothing touches
+    pyplot's global figure manager, so concurrent sessions (threads) can
+    render at the same time, and the figure is freed as soon as it is
+    released here instead of lingering until plt.close().
+    """
+    # matplotlib is imported on the first render (here or in a worker)
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    style = spec["style"]
+
+    fig = Figure(figsize=tuple(style["figsize"]))
+    FigureCanvasAgg(fig)
+    try:
+        ax = fig.subplots()
+
+        if spec["kind"] == "bar":
+            ax.bar(spec["x"], spec["y"])
+        else:
+            ax.plot(spec["x"], spec["y"])
+
+        ax.set_xticks(range(len(spec["x"])))
+        ax.set_xticklabels(spec["x"], rotation=style["rotation"])
+        ax.set_ylabel(spec["ylabel"])
+        ax.set_title(spec["title"])
+
+        image = io.BytesIO()
+        fig.tight_layout()
+        fig.savefig(image, format=spec["format"], dpi=style["dpi"])
+    finally:
+        fig.clear()
+
+    return image.getvalue()
+
+
+class ChartCache:
+    """
+    Thread-safe LRU of rendered chart bytes keyed by chart_key(spec),
+    bounded by total size in bytes.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 2 ** 20):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data: bytes):
+        with self._lock:
+            if key in self._items:
+                self._size -= len(self._items.pop(key))
+
+            self._items[key] = data
+            self._size += len(data)
+
+            while self._size > self.max_bytes and len(self._items) > 1:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._size = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._items),
+            "bytes": self._size,
+        }
+
+
+_default_cache = None
+_pool = None
+_pool_warm = []
+_pool_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def get_chart_cache() -> ChartCache:
+    global _default_cache
+    with _pool_lock:
+        if _default_cache is None:
+            _default_cache = ChartCache(int(os.getenv("CHART_CACHE_BYTES", 32 * 2 ** 20)))
+        return _default_cache
+
+
+def chart_workers() -> int:
+    # No point in worker processes on a single core
+    return int(os.getenv("CHART_WORKERS", min(2, os.cpu_count() or 1)))
+
+
+def _warm_worker():
+    # Pays the matplotlib import and font cache load up front
+    render_chart(chart_spec("bar", ["a"], [1.0], title="", ylabel=""))
+    return True
+
+
+def _render_pool(start: bool = True):
+    """
+    The shared worker pool, or None while it is still warming up. Workers
+    are spawned (not forked: forking a process that runs Streamlit threads
+    is unsafe) and warmed in the background, so the first renders happen
+    inline instead of waiting seconds for worker start-up.
+    """
+    global _pool, _pool_warm
+    with _pool_lock:
+        if _pool is None:
+            if not start:
+                return None
+            workers = chart_workers()
+            if workers < 2:
+                return None
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _pool_warm = [_pool.submit(_warm_worker) for _ in range(workers)]
+
+        if all(future.done() for future in _pool_warm):
+            return _pool
+        return None
+
+
+def shutdown_render_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def render_charts(specs, cache: ChartCache = None, parallel: bool = True):
+    """
+    Returns rendered bytes for each spec, in order. Cached charts cost
+    nothing, and a chart another thread is already rendering is waited
+    for rather than drawn twice. Two or more misses are rasterized in
+    parallel worker processes once the pool is warm; until then, and for
+    a single miss, they are drawn in this process.
+    """
+    if cache is None:
+        cache = get_chart_cache()
+
+    keys = [chart_key(spec) for spec in specs]
+    results = [cache.get(key) for key in keys]
+
+    # Claim the misses nobody else is rendering; identical specs once
+    claimed = {}
+    waiting = {}
+    with _inflight_lock:
+        for key, spec, data in zip(keys, specs, results):
+            if data is not None or key in claimed or key in waiting:
+                continue
+            if key in _inflight:
+                waiting[key] = (spec, _inflight[key])
+            else:
+                _inflight[key] = threading.Event()
+                claimed[key] = spec
+
+    rendered = {}
+    try:
+        pool = _render_pool() if parallel and len(claimed) > 1 else None
+        if pool is not None:
+            try:
+                futures = {key: pool.submit(render_chart, spec) for key, spec in claimed.items()}
+                rendered = {key: future.result() for key, future in futures.items()}
+            except Exception as e:
+                print(f"Parallel chart rendering failed, rendering inline: {str(e)}")
+                shutdown_render_pool()
+                rendered = {}
+
+        for key, spec in claimed.items():
+            if key not in rendered:
+                rendered[key] = render_chart(spec)
+            cache.put(key, rendered[key])
+    finally:
+        with _inflight_lock:
+            for key in claimed:
+                _inflight.pop(key).set()
+
+    for key, (spec, done) in waiting.items():
+        done.wait()
+        data = cache.get(key)
+        # The other render failed or was already evicted
+        rendered[key] = data if data is not None else render_chart(spec)
+
+    return [data if data is not None else rendered[key] for key, data in zip(keys, results)]
+
+
+def render_chart_cached(spec, cache: ChartCache = None) -> bytes:
+    return render_charts([spec], cache=cache)[0]
@@ -1,13 +1,42 @@
 import io
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
 
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib import colors, pagesizes
-from reportlab.lib.styles import getSampleStyleSheet 
-from reportlab.lib.units import inch
+import numpy as np
+import pandas as pd
 
-from core.report import monthly_spend_trend
+from core.report import build_report
+from core.charts import (
+    category_chart_spec,
+    monthly_trend_chart_spec,
+    render_charts,
+    render_chart_cached
+)
+
+
+# Low-cardinality string columns stored as dictionary-encoded (categorical)
+DICTIONARY_COLUMNS = ["category", "classification_source"]
+
+# PDF appendix: (column, header, width in points) on an A4 page with 1" margins
+APPENDIX_COLUMNS = [
+    ("date", "Date", 52),
+    ("description", "Description", 150),
+    ("category", "Category", 80),
+    ("amount", "Amount", 62),
+    ("anomaly_reason", "Anomaly Reason", 107),
+]
+APPENDIX_MODES = ["flagged", "all"]
+APPENDIX_FONT_SIZE = 6.5
+APPENDIX_ROW_HEIGHT = 10
+APPENDIX_CHUNK_ROWS = 500
+
+# The page limit is the appendix's memory limit: reportlab keeps every
+# finished page in memory until the document is saved (about 25-30 KiB per
+# appendix page with the output spooled, so ~55 MiB at the default 2000),
+# while the ledger itself is only read a chunk at a time and up to the
+# page limit. PDF_SPOOL_BYTES: suggested in-memory size for a spooled
+# output file before it moves to disk
+PDF_APPENDIX_MAX_PAGES = int(os.getenv("PDF_APPENDIX_MAX_PAGES", 2000))
+PDF_SPOOL_BYTES = int(os.getenv("PDF_SPOOL_BYTES", 16 * 2 ** 20))
 
 
 def generate_csv_export(df: pd.DataFrame):
@@ -15,39 +44,218 @@ def generate_csv_export(df: pd.DataFrame):
     df.to_csv(output, index=False)
     return output.getvalue()
 
+
+# pyarrow and reportlab are imported inside the functions that need them,
+# so loading this module (or one export format) doesn't pull in the rest
+
+def _to_arrow_table(df: pd.DataFrame):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    for name in DICTIONARY_COLUMNS:
+        if name in table.column_names:
+            position = table.column_names.index(name)
+            encoded = pc.dictionary_encode(table[name])
+            table = table.set_column(position, name, encoded)
+
+    return table
+
+
+def generate_parquet_export(df: pd.DataFrame, compression: str = "zstd") -> bytes:
+    # Keeps dtypes (datetimes, booleans, float confidence) so downstream
+    # jobs can load results without re-parsing CSV
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = pa.BufferOutputStream()
+    pq.write_table(_to_arrow_table(df), sink, compression=compression)
+    return sink.getvalue().to_pybytes()
+
+
+def generate_arrow_export(df: pd.DataFrame, compression: str = "zstd") -> bytes:
+    # Arrow IPC file format. zstd buffers are decompressed when read; pass
+    # compression=None for a file pyarrow.ipc.open_file can memory-map and
+    # read zero-copy.
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+
+    table = _to_arrow_table(df)
+    sink = pa.BufferOutputStream()
+    options = pa_ipc.IpcWriteOptions(compression=compression)
+
+    with pa_ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+
+    return sink.getvalue().to_pybytes()
+
 def create_category_chart(category_summary):
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.bar(category_summary["category"], category_summary["amount"])
-    ax.set_xticklabels(category_summary["category"], rotation=45)
-    ax.set_ylabel("Total Spend")
-    ax.set_title("Spend by Category")
-
-    img_buffer = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(img_buffer, format="png")
-    plt.close(fig)
-
-    img_buffer.seek(0)
-    return img_buffer
-    
+    return io.BytesIO(render_chart_cached(category_chart_spec(category_summary)))
+
+
 def create_monthly_trend_chart(monthly_data):
-    fig, ax = plt.subplots(figsize=(6, 4))
-    ax.plot(monthly_data["month"], monthly_data["amount"])
-    ax.set_xticklabels(monthly_data["month"], rotation=45)
-    ax.set_ylabel("Monthly Spend")
-    ax.set_title("Monthly Spend Trend")
+    return io.BytesIO(render_chart_cached(monthly_trend_chart_spec(monthly_data)))
+
 
-    img_buffer = io.BytesIO()
-    plt.tight_layout()
-    plt.savefig(img_buffer, format="png")
-    plt.close(fig)
+def _clip(values, width: int):
+    # Cells have fixed sizes, so long text is cut to roughly fit its column
+    limit = max(int(width / (APPENDIX_FONT_SIZE * 0.55)), 4)
+    return [
+        text if len(text) <= limit else text[:limit - 3] + "..."
+        for text in values.astype(str)
+    ]
 
-    img_buffer.seek(0)
-    return img_buffer
 
+def _appendix_cells(columns: dict, start: int, stop: int):
+    """
+    Formats rows [start, stop) column by column and returns them as table
+    rows of strings, without going through iterrows.
+    """
+    formatted = []
+
+    for name, _, width in APPENDIX_COLUMNS:
+        values = columns[name][start:stop]
+
+        if name == "date":
+            text = np.datetime_as_string(values.astype("datetime64[D]"))
+            formatted.append(np.where(text == "NaT", "", text).tolist())
+        elif name == "amount":
+            formatted.append([f"{value:,.2f}" for value in values])
+        else:
+            formatted.append(_clip(values, width))
+
+    return [list(row) for row in zip(*formatted)]
+
+
+def _appendix_max_rows(doc, max_pages: int, chunk_rows: int):
+    # Every row has the same fixed height; one row per page is the repeated
+    # header, and the appendix title takes about six rows on its first page.
+    # A chunk starting mid-page costs up to two more rows (its own header,
+    # plus one left empty when only the header would fit).
+    rows_per_page = max(int((doc.height - 12) // APPENDIX_ROW_HEIGHT) - 1, 1)
+    slots = max(max_pages * rows_per_page - 6, 0)
+    return slots * chunk_rows // (chunk_rows + 2)
+
+
+def _appendix_chunks(df: pd.DataFrame, max_rows: int, chunk_rows: int):
+    """
+    Yields one deferred LongTable per chunk_rows rows. Cells are only
+    formatted when reportlab lays the chunk out, and a chunk is dropped
+    once drawn, so just one chunk's cells exist at a time. Only the first
+    max_rows rows are copied out of the frame.
+    """
+    from reportlab.lib import colors
+    from reportlab.platypus import Flowable, LongTable, TableStyle
+
+    df = df.iloc[:max_rows]
+    columns = {}
+    for name, _, _ in APPENDIX_COLUMNS:
+        if name == "date":
+            columns[name] = pd.to_datetime(df[name], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        elif name == "amount":
+            columns[name] = df[name].to_numpy(dtype=float)
+        elif name in df.columns:
+            columns[name] = df[name].fillna("").to_numpy(dtype=object)
+        else:
+            columns[name] = np.full(len(df), "", dtype=object)
+
+    header = [title for _, title, _ in APPENDIX_COLUMNS]
+    widths = [width for _, _, width in APPENDIX_COLUMNS]
+    style = TableStyle([
+        ("FONTSIZE", (0, 0), (-1, -1), APPENDIX_FONT_SIZE),
+        ("LEADING", (0, 0), (-1, -1), APPENDIX_FONT_SIZE + 1),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("ALIGN", (3, 0), (3, -1), "RIGHT"),
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("TOPPADDING", (0, 0), (-1, -1), 1),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+    ])
 
-def generate_pdf_report(df, metrics, category_summary, anomaly_data, top_transactions):
-    buffer = io.BytesIO()
+    class DeferredTable(Flowable):
+        def __init__(self, start, stop):
+            Flowable.__init__(self)
+            self.start = start
+            self.stop = stop
+            self._table = None
+
+        def table(self):
+            if self._table is None:
+                data = [header] + _appendix_cells(columns, self.start, self.stop)
+                # Fixed widths and heights: reportlab skips measuring cells
+                self._table = LongTable(
+                    data,
+                    colWidths=widths,
+                    rowHeights=[APPENDIX_ROW_HEIGHT] * len(data),
+                    style=style,
+                    repeatRows=1,
+                    normalizedData=1
+                )
+            return self._table
+
+        def wrap(self, availWidth, availHeight):
+            return self.table().wrap(availWidth, availHeight)
+
+        def split(self, availWidth, availHeight):
+            return self.table().split(availWidth, availHeight)
+
+        def drawOn(self, canvas, x, y, _sW=0):
+            return self.table().drawOn(canvas, x, y, _sW)
+
+    for start in range(0, min(len(df), max_rows), chunk_rows):
+        yield DeferredTable(start, min(start + chunk_rows, max_rows))
+
+
+def generate_pdf_report(
+    df,
+    metrics=None,
+    category_summary=None,
+    anomaly_data=None,
+    top_transactions=None,
+    report=None,
+    appendix=None,
+    max_pages=None,
+    chunk_rows=APPENDIX_CHUNK_ROWS,
+    output=None
+):
+    """
+    Returns the PDF as a rewound BytesIO, or writes it to `output` (a path
+    or a writable binary file) and returns that instead. For large
+    appendices pass e.g. tempfile.SpooledTemporaryFile(PDF_SPOOL_BYTES),
+    which moves to disk once the PDF outgrows memory.
+
+    appendix="flagged" lists every anomalous transaction after the report,
+    appendix="all" the full ledger. The appendix is cut off at max_pages
+    pages, with a note saying how many rows were left out.
+    """
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
+    from reportlab.lib import colors, pagesizes
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+
+    if appendix is not None and appendix not in APPENDIX_MODES:
+        raise ValueError(f"appendix must be one of {APPENDIX_MODES} or None, got {appendix!r}")
+
+    # Sections not passed explicitly come from the report bundle, built
+    # here only if the caller did not supply one
+    if report is None:
+        report = build_report(df)
+
+    metrics = report.metrics if metrics is None else metrics
+    category_summary = report.category_summary if category_summary is None else category_summary
+    anomaly_data = report.anomalies if anomaly_data is None else anomaly_data
+    top_transactions = report.top_transactions if top_transactions is None else top_transactions
+
+    # Both charts rasterize in parallel (or come straight from the cache
+    # when the dashboard already drew them)
+    category_png, trend_png = render_charts([
+        category_chart_spec(category_summary),
+        monthly_trend_chart_spec(report.monthly_trend),
+    ])
+
+    max_pages = PDF_APPENDIX_MAX_PAGES if max_pages is None else max_pages
+    buffer = io.BytesIO() if output is None else output
     doc = SimpleDocTemplate(buffer, pagesize=pagesizes.A4)
 
     elements = []
@@ -104,7 +312,7 @@ def generate_pdf_report(df, metrics, category_summary, anomaly_data, top_transac
     elements.append(Paragraph("<b>Category Spend Chart</b>", styles["Heading2"]))
     elements.append(Spacer(1, 0.2 * inch))
     
-    chart_buffer = create_category_chart(category_summary)
+    chart_buffer = io.BytesIO(category_png)
     elements.append(Image(chart_buffer, width=400, height=250))
     elements.append(Spacer(1, 0.4 * inch))
 
@@ -115,6 +323,7 @@ def generate_pdf_report(df, metrics, category_summary, anomaly_data, top_transac
     anomaly_table = Table([
         ["Category-based anomalies", anomaly_data["category_anomalies"]],
         ["Duplicate anomalies", anomaly_data["duplicate_anomalies"]],
+        ["Near-duplicate charges", anomaly_data.get("near_duplicate_anomalies", 0)],
         ["High absolute risk transactions", anomaly_data["high_absolute_risk"]],
     ])
 
@@ -130,8 +339,7 @@ def generate_pdf_report(df, metrics, category_summary, anomaly_data, top_transac
     elements.append(Paragraph("<b>Monthly Spend Trend</b>", styles["Heading2"]))
     elements.append(Spacer(1, 0.2 * inch))
     
-    monthly_data = monthly_spend_trend(df)
-    trend_buffer = create_monthly_trend_chart(monthly_data)
+    trend_buffer = io.BytesIO(trend_png)
     elements.append(Image(trend_buffer, width=400, height=250))
     elements.append(Spacer(1, 0.4 * inch))
 
@@ -157,7 +365,35 @@ def generate_pdf_report(df, metrics, category_summary, anomaly_data, top_transac
 
     elements.append(top_table)
 
+    # Transaction Appendix
+    if appendix is not None:
+        if appendix == "flagged":
+            ledger = df[df["anomaly_flag"].to_numpy(dtype=bool)]
+            title = "Appendix: Flagged Transactions"
+        else:
+            ledger = df
+            title = "Appendix: All Transactions"
+
+        max_rows = _appendix_max_rows(doc, max_pages, chunk_rows)
+
+        elements.append(PageBreak())
+        elements.append(Paragraph(f"<b>{title}</b>", styles["Heading2"]))
+
+        if len(ledger) == 0:
+            elements.append(Paragraph("No transactions.", styles["Normal"]))
+        elif len(ledger) > max_rows:
+            elements.append(Paragraph(
+                f"Showing the first {max_rows:,} of {len(ledger):,} rows "
+                f"(limit of {max_pages:,} pages).",
+                styles["Normal"]
+            ))
+
+        elements.append(Spacer(1, 0.1 * inch))
+        elements.extend(_appendix_chunks(ledger, max_rows, chunk_rows))
+
     doc.build(elements)
-    buffer.seek(0)
+
+    if output is None:
+        buffer.seek(0)
 
     return buffer
\ No newline at end of file
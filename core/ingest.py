@@ -0,0 +1,156 @@
+import csv
+
+import numpy as np
+import pandas as pd
+
+from core.validator import CSVValidationError, validate_columns
+from core.preprocessing import DROP_RULES, guess_date_format, preprocess_with_report
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pragma: no cover - pyarrow is in requirements
+    pa = None
+    pa_csv = None
+
+
+class ChunkedCSVReader:
+    """
+    Streams a CSV upload as validated, preprocessed chunks so files larger
+    than memory never have to be loaded whole.
+
+    Iterating yields clean DataFrames whose indexes continue from one chunk
+    to the next, so concatenating them gives the same frame as
+    preprocess_dataframe(validate_and_load(file)). The date format is
+    inferred once, from the first date in the file as pd.to_datetime does
+    for a whole column, and used for every chunk. `report` is updated as
+    chunks are produced with rows read / kept and rows dropped per rule.
+
+    The pyarrow streaming reader is used when available (chunk size set by
+    block_size in bytes); otherwise pandas reads chunk_rows rows at a time.
+    """
+
+    def __init__(
+        self,
+        file,
+        chunk_rows: int = 250_000,
+        block_size: int = 32 * 2 ** 20,
+        engine: str = "auto"
+    ):
+        self.file = file
+        self.chunk_rows = chunk_rows
+        self.block_size = block_size
+
+        if engine == "auto":
+            engine = "pyarrow" if pa_csv is not None and self._rewindable() else "pandas"
+        self.engine = engine
+
+        self.report = {
+            "chunks": 0,
+            "rows_read": 0,
+            "rows_kept": 0,
+            **dict.fromkeys(DROP_RULES, 0),
+        }
+
+    def _rewindable(self) -> bool:
+        # The pyarrow path reads the header line first, then starts over
+        if isinstance(self.file, str):
+            return True
+        return hasattr(self.file, "seek") and getattr(self.file, "seekable", lambda: False)()
+
+    def _header_names(self):
+        if isinstance(self.file, str):
+            with open(self.file, "rb") as f:
+                line = f.readline()
+        else:
+            line = self.file.readline()
+            self.file.seek(0)
+
+        if isinstance(line, bytes):
+            line = line.decode("utf-8-sig")
+
+        return next(csv.reader([line]), [])
+
+    def _pandas_chunks(self):
+        with pd.read_csv(self.file, chunksize=self.chunk_rows) as reader:
+            yield from reader
+
+    def _arrow_chunks(self):
+        read_options = pa_csv.ReadOptions(block_size=self.block_size)
+
+        # Read every column as text so a value that only shows up in a later
+        # block can't break type inference; coercion happens in preprocessing
+        names = self._header_names()
+
+        convert_options = pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in names},
+            strings_can_be_null=True
+        )
+        reader = pa_csv.open_csv(
+            self.file,
+            read_options=read_options,
+            convert_options=convert_options
+        )
+
+        empty = True
+        for batch in reader:
+            empty = False
+            chunk = batch.to_pandas()
+            # Nulls as NaN, matching what pandas.read_csv produces
+            yield chunk.where(chunk.notna(), np.nan)
+
+        # Header-only file: still validate its columns
+        if empty:
+            yield pd.DataFrame(columns=names)
+
+    def _rewind(self):
+        # Lets the reader be iterated more than once (two-pass consumers)
+        if not isinstance(self.file, str) and self._rewindable():
+            self.file.seek(0)
+
+    def __iter__(self):
+        self._rewind()
+        for key in self.report:
+            self.report[key] = 0
+
+        chunks = self._arrow_chunks() if self.engine == "pyarrow" else self._pandas_chunks()
+
+        offset = 0
+        validated = False
+        format_known = False
+        date_format = None
+
+        while True:
+            try:
+                raw = next(chunks)
+            except StopIteration:
+                break
+            except Exception as e:
+                raise CSVValidationError(f"Invalid CSV file: {str(e)}")
+
+            # Normalize column names
+            raw.columns = raw.columns.str.lower().str.strip()
+
+            if not validated:
+                validate_columns(raw)
+                validated = True
+
+            if not format_known:
+                format_known, date_format = guess_date_format(raw["date"])
+
+            clean, dropped = preprocess_with_report(raw, inplace=True, date_format=date_format)
+            clean.index = pd.RangeIndex(offset, offset + len(clean))
+            offset += len(clean)
+
+            self.report["chunks"] += 1
+            self.report["rows_read"] += len(raw)
+            self.report["rows_kept"] += len(clean)
+            for rule, count in dropped.items():
+                self.report[rule] += count
+
+            if len(clean):
+                yield clean
+
+
+def stream_csv(file, chunk_rows: int = 250_000, block_size: int = 32 * 2 ** 20, engine: str = "auto"):
+    return ChunkedCSVReader(file, chunk_rows=chunk_rows, block_size=block_size, engine=engine)
@@ -0,0 +1,108 @@
+from collections import deque
+from functools import lru_cache
+
+import pandas as pd
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a {category: [keywords]} mapping.
+
+    Matching walks each description once, so the cost depends on the
+    description length rather than the number of keywords. When several
+    keywords match, the category listed first in the mapping wins, which
+    mirrors the original nested-loop behaviour.
+    """
+
+    def __init__(self, keyword_map: dict):
+        self.categories = list(keyword_map.keys())
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._rank = [None]
+
+        for rank, keywords in enumerate(keyword_map.values()):
+            for keyword in keywords:
+                self._add(keyword.lower(), rank)
+
+        self._build_fail_links()
+
+    def _add(self, keyword: str, rank: int):
+        if not keyword:
+            return
+
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._rank.append(None)
+            node = nxt
+
+        if self._rank[node] is None or rank < self._rank[node]:
+            self._rank[node] = rank
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+
+            for char, child in self._goto[node].items():
+                queue.append(child)
+
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+
+                # Fold the best rank reachable through the fail chain into
+                # the node so matching never has to walk output links.
+                inherited = self._rank[self._fail[child]]
+                own = self._rank[child]
+                if inherited is not None and (own is None or inherited < own):
+                    self._rank[child] = inherited
+
+    def match(self, description: str):
+        goto, fail, ranks = self._goto, self._fail, self._rank
+
+        node = 0
+        best = None
+
+        for char in description.lower():
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            rank = ranks[node]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+                if best == 0:
+                    break
+
+        return None if best is None else self.categories[best]
+
+    def match_series(self, descriptions: pd.Series) -> pd.Series:
+        # Ledgers repeat merchants heavily, so each distinct string is only
+        # scanned once and the result is mapped back onto the column.
+        unique = pd.unique(descriptions)
+        lookup = {desc: self.match(str(desc)) for desc in unique}
+
+        return descriptions.map(lookup).astype(object)
+
+
+def _freeze(keyword_map: dict):
+    return tuple((category, tuple(keywords)) for category, keywords in keyword_map.items())
+
+
+@lru_cache(maxsize=8)
+def _cached_matcher(frozen):
+    return KeywordMatcher({category: list(keywords) for category, keywords in frozen})
+
+
+def get_matcher(keyword_map: dict) -> KeywordMatcher:
+    return _cached_matcher(_freeze(keyword_map))
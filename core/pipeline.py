@@ -0,0 +1,83 @@
+import time
+import tracemalloc
+
+import pandas as pd
+
+from core.preprocessing import preprocess_dataframe
+from core.categorizer import categorize_dataframe
+from core.anomaly import apply_anomaly_detection
+
+
+def _measure(stage, df, profile, stats, name):
+    if not profile:
+        return stage(df)
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+
+    result = stage(df)
+
+    current, peak = tracemalloc.get_traced_memory()
+    stats[name] = {
+        "seconds": time.perf_counter() - started,
+        "peak_bytes": peak - baseline,
+        "retained_bytes": current - baseline,
+    }
+
+    if started_tracing:
+        tracemalloc.stop()
+
+    return result
+
+
+def run_pipeline(
+    df: pd.DataFrame,
+    inplace: bool = False,
+    profile: bool = False,
+    baseline=None,
+    upload_id: str = None,
+    **categorize_kwargs
+) -> pd.DataFrame:
+    """
+    preprocess -> categorize -> anomaly detection on a loaded frame.
+
+    By default every stage copies its input (the pure-function API), so
+    the caller's frame is left untouched. With inplace=True (pipeline
+    mode) stages add their columns to the frame they are given instead,
+    so peak memory is roughly the input plus the new columns. With
+    profile=True, per-stage time and tracemalloc peak / retained bytes
+    are stored in df.attrs["stage_memory"].
+
+    With a baseline (core.baseline.CategoryBaseline), category z-scores use
+    the stored history plus this file, and the file is then merged into
+    the baseline under upload_id (a file already merged is not counted twice).
+    """
+    stats = {}
+
+    df = _measure(
+        lambda frame: preprocess_dataframe(frame, inplace=inplace),
+        df, profile, stats, "preprocess"
+    )
+    df = _measure(
+        lambda frame: categorize_dataframe(frame, inplace=inplace, **categorize_kwargs),
+        df, profile, stats, "categorize"
+    )
+    df = _measure(
+        lambda frame: apply_anomaly_detection(
+            frame, inplace=inplace, baseline=baseline, upload_id=upload_id
+        ),
+        df, profile, stats, "anomaly"
+    )
+
+    if baseline is not None:
+        baseline.merge(df, upload_id=upload_id)
+
+    if profile:
+        df.attrs["stage_memory"] = stats
+
+    return df
@@ -1,25 +1,128 @@
 import pandas as pd
 
+# Merchant key cleanup, applied in order to lowercased text: "#3921"-style
+# references, "ref 998877" / "txn:ab123" / "order 402-..." references,
+# punctuation, then long digit runs (transaction ids, posting dates).
+# Shorter numbers stay, so "Vendor 00012" and "Vendor 00034" are distinct.
+MERCHANT_NOISE = [
+    r"#\s*\S+",
+    r"\b(?:ref|reference|txn|trx|transaction|auth|order|inv|invoice|receipt)"
+    r"(?:\s*(?:no|id|number))?\b[\s.:#-]*[a-z0-9-]*\d[a-z0-9-]*",
+    r"[^\w\s]|_",
+    r"\b\d{6,}\b",
+]
 
-def preprocess_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
 
-    # Parse dates
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
+DROP_RULES = ("invalid_date", "invalid_amount", "empty_description")
+
+# Values pd.to_datetime skips when picking the element to infer a format from
+DATE_PLACEHOLDERS = {"", "NaT", "nat", "NAT", "nan", "NaN", "NAN", "now", "today"}
+
+
+def date_text(dates: pd.Series) -> pd.Series:
+    # Digit-only dates (20240105) are read as numbers, and pd.to_datetime
+    # would take them as epoch nanoseconds; parse them as text instead
+    if dates.dtype == object or not pd.api.types.is_numeric_dtype(dates):
+        return dates
+
+    return dates.map(
+        lambda value: None if pd.isna(value)
+        else str(int(value)) if float(value).is_integer() else str(value)
+    ).astype(object)
+
+
+def guess_date_format(dates: pd.Series):
+    """
+    The format pd.to_datetime would infer for this column: that of its
+    first non-null value. Returns (found, format); found is False when the
+    column has no candidate value yet. A value whose format can't be
+    guessed gives "mixed" (every element parsed on its own, which is what
+    pandas falls back to).
+    """
+    from pandas.tseries.api import guess_datetime_format
 
-    # Remove rows with invalid dates
-    df = df.dropna(subset=["date"])
+    for value in date_text(dates):
+        if isinstance(value, str):
+            if value in DATE_PLACEHOLDERS:
+                continue
+            return True, guess_datetime_format(value) or "mixed"
+        if not pd.isna(value):
+            # Already datetimes / numbers: nothing to infer
+            return True, None
+
+    return False, None
+
+
+def preprocess_with_report(df: pd.DataFrame, inplace: bool = False, date_format: str = None):
+    """
+    Same cleaning as preprocess_dataframe, also returning how many rows
+    each rule dropped. Rules are attributed in order, so a row with both a
+    bad date and a bad amount counts once, as invalid_date.
+
+    date_format is passed to pd.to_datetime; chunked readers use it so
+    every chunk is parsed with the format inferred for the whole file.
+    """
+    # With inplace=True the columns are coerced on the caller's frame; rows
+    # are then dropped with one combined mask, which only allocates a new
+    # frame if something is actually removed.
+    if not inplace:
+        df = df.copy()
+
+    # Parse dates
+    df["date"] = pd.to_datetime(date_text(df["date"]), errors="coerce", format=date_format)
 
     # Convert amount to numeric
     df["amount"] = pd.to_numeric(df["amount"], errors="coerce")
 
-    # Remove invalid amounts
-    df = df.dropna(subset=["amount"])
-
     # Normalize description
     df["description"] = df["description"].astype(str).str.strip()
 
-    # Remove empty descriptions
-    df = df[df["description"] != ""]
+    # Remove rows with invalid dates, invalid amounts or empty descriptions
+    valid_date = df["date"].notna()
+    valid_amount = df["amount"].notna()
+    has_description = df["description"] != ""
+
+    keep = valid_date & valid_amount & has_description
+
+    dropped = {
+        "invalid_date": int((~valid_date).sum()),
+        "invalid_amount": int((valid_date & ~valid_amount).sum()),
+        "empty_description": int((valid_date & valid_amount & ~has_description).sum()),
+    }
+
+    if not keep.all():
+        # A new frame, not a slice, so later stages can add columns to it
+        df = df.loc[keep].reset_index(drop=True)
+    else:
+        df.reset_index(drop=True, inplace=True)
+
+    return df, dropped
+
+
+def preprocess_dataframe(df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+    df, _ = preprocess_with_report(df, inplace=inplace)
+    return df
+
+
+def normalize_description(description: str) -> str:
+    # Case and whitespace insensitive key used to group repeated merchants
+    return " ".join(str(description).lower().split())
+
+
+def merchant_key(descriptions: pd.Series) -> pd.Series:
+    # Looser key than normalize_description: also drops reference numbers
+    # and punctuation (see MERCHANT_NOISE), so "UBER *TRIP #3921" and "Uber Trip" compare equal.
+    # Each distinct description is cleaned once and mapped back.
+    codes, uniques = pd.factorize(descriptions.astype(str))
+
+    cleaned = pd.Series(uniques, dtype=object).str.lower()
+    for pattern in MERCHANT_NOISE:
+        cleaned = cleaned.str.replace(pattern, " ", regex=True)
+    cleaned = cleaned.str.split().str.join(" ")
+
+    # Descriptions that are nothing but noise keep their normalized text
+    empty = cleaned == ""
+    if empty.any():
+        cleaned[empty] = pd.Series(uniques)[empty].map(normalize_description)
 
-    return df.reset_index(drop=True)
+    return pd.Series(cleaned.to_numpy()[codes], index=descriptions.index)
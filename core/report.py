@@ -1,64 +1,159 @@
+from types import MappingProxyType
+from typing import NamedTuple
+
+import numpy as np
 import pandas as pd
 
 
-def generate_summary_metrics(df: pd.DataFrame):
-    total_spend = df["amount"].sum()
-    total_transactions = len(df)
-    total_anomalies = df["anomaly_flag"].sum()
+class ReportBundle(NamedTuple):
+    """
+    Every dashboard / PDF aggregate for one processed frame, computed by
+    build_report(). Immutable: the dicts are read-only views, and the
+    accessor functions below hand out copies of the frames, so one bundle
+    can be memoized and shared by the dashboard and the exporter.
+    """
+    metrics: MappingProxyType
+    category_summary: pd.DataFrame
+    average_by_category: pd.DataFrame
+    monthly_trend: pd.DataFrame
+    top_transactions: pd.DataFrame
+    anomalies: MappingProxyType
 
-    return {
-        "total_spend": total_spend,
-        "total_transactions": total_transactions,
-        "total_anomalies": total_anomalies
-    }
 
+def _group_sums(codes: np.ndarray, amount: np.ndarray, n_groups: int):
+    # Segment sums / non-missing counts, skipping NaN amounts like groupby
+    labelled = codes >= 0
+    group = np.where(labelled, codes, 0)
+    present = labelled & ~np.isnan(amount)
 
-def spend_by_category(df: pd.DataFrame):
-    summary = (
-        df.groupby("category")["amount"]
-        .sum()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
+    sums = np.bincount(group, weights=np.where(present, amount, 0.0), minlength=n_groups)
+    counts = np.bincount(group, weights=present, minlength=n_groups)
 
-    summary["percentage"] = (
-        summary["amount"] / summary["amount"].sum() * 100
-    )
+    return sums[:n_groups], counts[:n_groups]
+
+
+def _category_aggregates(df: pd.DataFrame, amount: np.ndarray):
+    codes, uniques = pd.factorize(df["category"], sort=True)
+    sums, counts = _group_sums(codes, amount, len(uniques))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = sums / counts
+
+    names = np.asarray(uniques, dtype=object)
 
-    return summary
+    by_spend = np.argsort(-sums, kind="stable")
+    summary = pd.DataFrame({"category": names[by_spend], "amount": sums[by_spend]})
+    summary["percentage"] = summary["amount"] / summary["amount"].sum() * 100
 
+    # argsort puts NaN means (all amounts missing) last, like sort_values
+    by_mean = np.argsort(-means, kind="stable")
+    average = pd.DataFrame({"category": names[by_mean], "amount": means[by_mean]})
 
-def top_5_largest_transactions(df: pd.DataFrame):
-    return df.sort_values("amount", ascending=False).head(5)
+    return summary, average
 
 
-def anomaly_breakdown(df: pd.DataFrame):
+def _monthly_aggregates(df: pd.DataFrame, amount: np.ndarray):
+    months = df["date"].to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+    codes, uniques = pd.factorize(months, sort=True)
+    sums, _ = _group_sums(codes, amount, len(uniques))
+
+    return pd.DataFrame({
+        "month": np.datetime_as_string(np.asarray(uniques, dtype="datetime64[M]"), unit="M"),
+        "amount": sums,
+    })
+
+
+def _top_rows(df: pd.DataFrame, amount: np.ndarray, n: int):
+    # argpartition selects the n largest in O(rows); only those n are sorted.
+    # Missing amounts rank last, as with sort_values.
+    ranked = np.where(np.isnan(amount), -np.inf, amount)
+
+    if n < len(ranked):
+        candidates = np.argpartition(-ranked, n - 1)[:n]
+    else:
+        candidates = np.arange(len(ranked))
+
+    order = candidates[np.lexsort((candidates, -ranked[candidates]))]
+    return df.iloc[order]
+
+
+def _summary_metrics(df: pd.DataFrame):
+    return {
+        "total_spend": df["amount"].sum(),
+        "total_transactions": len(df),
+        "total_anomalies": df["anomaly_flag"].sum(),
+    }
+
+
+def _anomaly_counts(df: pd.DataFrame):
     return {
         "category_anomalies": df["category_outlier_flag"].sum(),
         "duplicate_anomalies": df["duplicate_flag"].sum(),
-        "high_absolute_risk": df["high_absolute_flag"].sum()
+        "near_duplicate_anomalies": (
+            df["near_duplicate_flag"].sum() if "near_duplicate_flag" in df.columns else 0
+        ),
+        "high_absolute_risk": df["high_absolute_flag"].sum(),
     }
 
 
-def monthly_spend_trend(df: pd.DataFrame):
-    df_copy = df.copy()
-    df_copy["month"] = df_copy["date"].dt.to_period("M")
+def _amounts(df: pd.DataFrame) -> np.ndarray:
+    return df["amount"].to_numpy(dtype=float)
+
 
-    monthly = (
-        df_copy.groupby("month")["amount"]
-        .sum()
-        .reset_index()
+def build_report(df: pd.DataFrame, top_n: int = 5) -> ReportBundle:
+    """
+    Computes all report aggregates with one factorize + bincount pass per
+    grouping (category, month) and a partial selection for the top rows.
+    """
+    amount = _amounts(df)
+
+    category_summary, average_by_category = _category_aggregates(df, amount)
+
+    return ReportBundle(
+        metrics=MappingProxyType(_summary_metrics(df)),
+        category_summary=category_summary,
+        average_by_category=average_by_category,
+        monthly_trend=_monthly_aggregates(df, amount),
+        top_transactions=_top_rows(df, amount, top_n),
+        anomalies=MappingProxyType(_anomaly_counts(df)),
     )
 
-    monthly["month"] = monthly["month"].astype(str)
 
-    return monthly
+# The accessors take either a prebuilt bundle or a processed frame. For a
+# frame only the requested aggregate is computed, so each one needs just
+# the columns it reads (e.g. spend_by_category: category and amount).
 
+def generate_summary_metrics(data):
+    if isinstance(data, ReportBundle):
+        return dict(data.metrics)
+    return _summary_metrics(data)
 
-def average_spend_per_category(df: pd.DataFrame):
-    return (
-        df.groupby("category")["amount"]
-        .mean()
-        .sort_values(ascending=False)
-        .reset_index()
-    )
+
+def spend_by_category(data):
+    if isinstance(data, ReportBundle):
+        return data.category_summary.copy()
+    return _category_aggregates(data, _amounts(data))[0]
+
+
+def top_5_largest_transactions(data):
+    if isinstance(data, ReportBundle):
+        return data.top_transactions.head(5).copy()
+    return _top_rows(data, _amounts(data), 5)
+
+
+def anomaly_breakdown(data):
+    if isinstance(data, ReportBundle):
+        return dict(data.anomalies)
+    return _anomaly_counts(data)
+
+
+def monthly_spend_trend(data):
+    if isinstance(data, ReportBundle):
+        return data.monthly_trend.copy()
+    return _monthly_aggregates(data, _amounts(data))
+
+
+def average_spend_per_category(data):
+    if isinstance(data, ReportBundle):
+        return data.average_by_category.copy()
+    return _category_aggregates(data, _amounts(data))[1]
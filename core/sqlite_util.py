@@ -0,0 +1,22 @@
+from contextlib import closing
+
+
+class Transaction:
+    """
+    Context manager for one connection: commits (or rolls back) and always
+    closes it, unlike sqlite3's own context manager which leaves it open.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        with closing(self.conn):
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        return False
@@ -0,0 +1,393 @@
+import numpy as np
+import pandas as pd
+
+from core.anomaly import (
+    DUPLICATE_SUBSET,
+    group_moments,
+    moments_std,
+    near_duplicate_mask,
+    generate_anomaly_explanations
+)
+from core.preprocessing import merchant_key
+
+
+class GroupedMoments:
+    """
+    Running count / mean / M2 per group key, updated chunk by chunk.
+
+    Each chunk is reduced with group_moments() and folded into the totals
+    with Chan's pairwise merge, which stays numerically stable however
+    many chunks are combined. Two instances can be merged the same way.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self._positions = {}
+        self.rows = np.zeros(0)
+        self.count = np.zeros(0)
+        self.mean = np.zeros(0)
+        self.m2 = np.zeros(0)
+        self.sample = np.zeros(0)
+        self.varies = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _positions_for(self, keys):
+        positions = np.empty(len(keys), dtype=np.intp)
+
+        for i, key in enumerate(keys):
+            if key not in self._positions:
+                self._positions[key] = len(self.keys)
+                self.keys.append(key)
+            positions[i] = self._positions[key]
+
+        grow = len(self.keys) - len(self.rows)
+        if grow:
+            self.rows = np.concatenate([self.rows, np.zeros(grow)])
+            self.count = np.concatenate([self.count, np.zeros(grow)])
+            self.mean = np.concatenate([self.mean, np.zeros(grow)])
+            self.m2 = np.concatenate([self.m2, np.zeros(grow)])
+            self.sample = np.concatenate([self.sample, np.full(grow, np.nan)])
+            self.varies = np.concatenate([self.varies, np.zeros(grow, dtype=bool)])
+
+        return positions
+
+    def _merge_at(self, positions, rows, count, mean, m2, sample, varies):
+        na = self.count[positions]
+        ma = self.mean[positions]
+        sa = self.sample[positions]
+        mean = np.where(count > 0, mean, 0.0)
+
+        total = na + count
+        delta = mean - ma
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Copy the side that is empty so a single chunk keeps its exact mean
+            merged_mean = np.where(
+                na == 0, mean,
+                np.where(count == 0, ma, ma + delta * count / total)
+            )
+            merged_m2 = self.m2[positions] + np.where(
+                (na > 0) & (count > 0),
+                m2 + delta ** 2 * na * count / total,
+                m2
+            )
+
+        both = ~np.isnan(sa) & ~np.isnan(sample)
+
+        self.rows[positions] += rows
+        self.count[positions] = total
+        self.mean[positions] = merged_mean
+        self.m2[positions] = merged_m2
+        self.varies[positions] |= varies | (both & (sa != sample))
+        self.sample[positions] = np.where(np.isnan(sa), sample, sa)
+
+    def update(self, keys, values):
+        codes, uniques = pd.factorize(keys)
+        if not len(uniques):
+            return self
+
+        moments = group_moments(codes, np.asarray(values, dtype=float), len(uniques))
+        n = len(uniques)
+
+        self._merge_at(
+            self._positions_for(list(uniques)),
+            moments["counts"][:n],
+            moments["n_valid"][:n],
+            moments["means"][:n],
+            moments["m2"][:n],
+            moments["sample"][:n],
+            moments["varies"][:n]
+        )
+        return self
+
+    def merge(self, other: "GroupedMoments"):
+        if len(other):
+            self._merge_at(
+                self._positions_for(other.keys),
+                other.rows, other.count, other.mean,
+                other.m2, other.sample, other.varies
+            )
+        return self
+
+    def copy(self) -> "GroupedMoments":
+        other = GroupedMoments()
+        return other.merge(self)
+
+    def scale(self, factor: float):
+        # Down-weights everything seen so far (time decay); means are unchanged
+        self.rows = self.rows * factor
+        self.count = self.count * factor
+        self.m2 = self.m2 * factor
+        return self
+
+    def std(self):
+        return moments_std(self.count, self.m2, self.varies)
+
+    def zscores(self, keys, values, min_count: int = 5) -> np.ndarray:
+        """
+        z-score of each value against its group's running mean / std, with
+        the same rules as category_zscores: 0 for unknown groups, groups
+        with fewer than min_count rows, and constant groups.
+        """
+        values = np.asarray(values, dtype=float)
+        if not len(self):
+            return np.zeros(len(values))
+
+        position = self.lookup(keys)
+        known = position >= 0
+        at = np.where(known, position, 0)
+        std = self.std()
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            eligible = (self.rows >= min_count) & (std != 0)
+            scored = known & eligible[at]
+            return np.where(scored, (values - self.mean[at]) / std[at], 0.0)
+
+    def lookup(self, keys):
+        # Position of each key, -1 for keys never seen (or missing)
+        return pd.Index(self.keys, dtype=object).get_indexer(keys)
+
+
+class AnomalyStats:
+    """First-pass statistics: per-category and global amount moments."""
+
+    def __init__(self):
+        self.categories = GroupedMoments()
+        self.overall = GroupedMoments()
+
+    def update(self, df: pd.DataFrame):
+        self.categories.update(df["category"], df["amount"])
+        self.overall.update(np.zeros(len(df), dtype=np.int8), df["amount"])
+        return self
+
+    def merge(self, other: "AnomalyStats"):
+        self.categories.merge(other.categories)
+        self.overall.merge(other.overall)
+        return self
+
+    def global_mean_std(self):
+        if not len(self.overall):
+            return np.nan, np.nan
+        return self.overall.mean[0], self.overall.std()[0]
+
+
+class SeenHashes:
+    """
+    Set of 64-bit row hashes kept as a few sorted numpy runs (8 bytes per
+    distinct row, far smaller than a set of tuples).
+
+    New hashes are added as a run and runs of similar size are merged, so
+    lookups stay a handful of binary searches. When max_entries is
+    exceeded the oldest run is forgotten; `evicted` counts hashes dropped
+    that way, after which a repeat of a forgotten row is not flagged.
+    """
+
+    def __init__(self, max_entries: int = 50_000_000):
+        self.max_entries = max_entries
+        self.runs = []
+        self.size = 0
+        self.evicted = 0
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        found = np.zeros(len(hashes), dtype=bool)
+
+        for run in self.runs:
+            idx = np.searchsorted(run, hashes)
+            idx[idx == len(run)] = 0
+            found |= run[idx] == hashes
+
+        return found
+
+    def add(self, hashes: np.ndarray):
+        # hashes must be distinct and not already contained (as score_chunk
+        # guarantees), so runs stay disjoint and merging is a plain sort
+        if not len(hashes):
+            return
+
+        self.runs.append(np.sort(hashes))
+        self.size += len(self.runs[-1])
+
+        # Keep runs in age order; cap merged runs so eviction drops a slice
+        run_cap = max(1, self.max_entries // 8) if self.max_entries else None
+        while (
+            len(self.runs) > 1
+            and len(self.runs[-1]) >= len(self.runs[-2])
+            and (run_cap is None or len(self.runs[-1]) + len(self.runs[-2]) <= run_cap)
+        ):
+            newer = self.runs.pop()
+            older = self.runs.pop()
+            merged = np.concatenate([older, newer])
+            merged.sort()
+            self.runs.append(merged)
+
+        while self.max_entries and self.size > self.max_entries and len(self.runs) > 1:
+            oldest = self.runs.pop(0)
+            self.size -= len(oldest)
+            self.evicted += len(oldest)
+
+
+class NearDuplicateIndex:
+    """
+    First-pass record of each row's merchant key (as a 64-bit hash),
+    amount and date. Near duplicates can be any number of chunks apart
+    when the ledger is not in date order, so the mask is computed once
+    over the whole ledger by finish(); the second pass then takes each
+    chunk's slice in file order with next_flags().
+
+    Memory grows with the ledger, not the chunk: 24 bytes per row while
+    collecting, and about 160 bytes per row at the peak of finish() (the
+    concatenated columns plus the sort keys and permutations of
+    near_duplicate_mask), after which only the 1-byte mask is kept.
+    """
+
+    def __init__(self, window_days: float = 1, amount_tolerance: float = 1.0):
+        self.window_days = window_days
+        self.amount_tolerance = amount_tolerance
+        self._keys = []
+        self._amounts = []
+        self._dates = []
+        self.mask = None
+        self._offset = 0
+
+    def update(self, df: pd.DataFrame):
+        keys = merchant_key(df["description"]).to_numpy(dtype=object)
+        self._keys.append(pd.util.hash_array(keys))
+        self._amounts.append(df["amount"].to_numpy(dtype=float))
+        self._dates.append(pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[ns]"))
+        return self
+
+    def finish(self):
+        if self._keys:
+            self.mask = near_duplicate_mask(
+                np.concatenate(self._keys),
+                np.concatenate(self._amounts),
+                np.concatenate(self._dates),
+                window_days=self.window_days,
+                amount_tolerance=self.amount_tolerance
+            )
+        else:
+            self.mask = np.zeros(0, dtype=bool)
+
+        # Only the mask (one byte per row) is needed from here on
+        self._keys, self._amounts, self._dates = [], [], []
+        self._offset = 0
+        return self
+
+    def next_flags(self, n: int) -> np.ndarray:
+        flags = self.mask[self._offset:self._offset + n]
+        if len(flags) != n:
+            raise ValueError("Second pass has more rows than the first; the source must re-read the same rows")
+        self._offset += n
+        return flags
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    # Hashes depend on dtype (500 as int64 != 500.0 as float64), and chunks
+    # of one file can infer different dtypes, so normalize them first
+    rows = pd.DataFrame({
+        "date": pd.to_datetime(df["date"]).astype("datetime64[ns]"),
+        "amount": df["amount"].astype("float64"),
+        "description": df["description"].astype(object),
+    }, index=df.index)[DUPLICATE_SUBSET]
+
+    return pd.util.hash_pandas_object(rows, index=False).to_numpy()
+
+
+def collect_anomaly_stats(chunks, near: NearDuplicateIndex = None) -> AnomalyStats:
+    stats = AnomalyStats()
+    for chunk in chunks:
+        stats.update(chunk)
+        if near is not None:
+            near.update(chunk)
+
+    if near is not None:
+        near.finish()
+    return stats
+
+
+def score_chunk(
+    df: pd.DataFrame,
+    stats: AnomalyStats,
+    seen: SeenHashes,
+    near: NearDuplicateIndex = None,
+    z_threshold: float = 2.5,
+    min_count: int = 5,
+    inplace: bool = False
+):
+    """
+    Second pass for one chunk: adds the same columns as
+    apply_anomaly_detection, scored against the full-ledger `stats`.
+    Chunks must be scored in file order for duplicates to match. With
+    `near` (filled by collect_anomaly_stats), near duplicates are matched
+    across the whole ledger; without it, only within this chunk.
+    """
+    if not inplace:
+        df = df.copy()
+
+    amount = df["amount"].to_numpy(dtype=float)
+
+    z_scores = stats.categories.zscores(df["category"], amount, min_count=min_count)
+
+    df["category_zscore"] = z_scores
+    df["category_outlier_flag"] = np.abs(z_scores) > z_threshold
+
+    # Global z-scores
+    global_mean, global_std = stats.global_mean_std()
+    if global_std == 0:
+        df["high_absolute_flag"] = False
+    else:
+        df["high_absolute_flag"] = (amount - global_mean) / global_std > 3
+
+    # Duplicates: earlier chunks via the hash set, this chunk via duplicated()
+    hashes = row_hashes(df)
+    duplicate = seen.contains(hashes) | pd.Series(hashes).duplicated(keep="first").to_numpy()
+    seen.add(hashes[~duplicate])
+    df["duplicate_flag"] = duplicate
+
+    # Near duplicates: this chunk's slice of the whole-ledger mask
+    if near is not None:
+        near_flags = near.next_flags(len(df))
+    else:
+        near_flags = near_duplicate_mask(merchant_key(df["description"]), amount, df["date"])
+
+    df["near_duplicate_flag"] = near_flags & ~duplicate
+
+    df["anomaly_flag"] = (
+        df["category_outlier_flag"] |
+        df["duplicate_flag"] |
+        df["near_duplicate_flag"]
+    )
+
+    return generate_anomaly_explanations(df, inplace=True)
+
+
+def stream_anomaly_detection(
+    source,
+    z_threshold: float = 2.5,
+    max_hashes: int = 50_000_000,
+    inplace: bool = True,
+    ledger_near_duplicates: bool = False
+):
+    """
+    Out-of-core apply_anomaly_detection over a re-iterable source of
+    categorized chunks (e.g. a ChunkedCSVReader followed by
+    categorize_dataframe). The first pass only accumulates statistics;
+    the second yields scored chunks. Concatenated, the output matches the
+    in-memory path up to floating-point rounding in mean / std, in any
+    row order, except that near duplicates are only matched within a
+    chunk. Memory is one chunk plus the duplicate hashes (8 bytes per
+    distinct row).
+
+    ledger_near_duplicates=True matches near duplicates across the whole
+    ledger (exactly as the in-memory path) with a NearDuplicateIndex,
+    which costs about 160 bytes per row at the end of the first pass:
+    more than the in-memory path needs for near duplicates alone.
+    """
+    near = NearDuplicateIndex() if ledger_near_duplicates else None
+    stats = collect_anomaly_stats(source, near)
+    seen = SeenHashes(max_entries=max_hashes)
+
+    for chunk in source:
+        yield score_chunk(chunk, stats, seen, near, z_threshold=z_threshold, inplace=inplace)
@@ -0,0 +1,107 @@
+import threading
+
+from llm.prompt_builder import build_batch_prompt, estimate_tokens, format_transaction
+
+# Rough size of one {"id", "category", "confidence"} result object
+OUTPUT_TOKENS_PER_ITEM = 24
+
+
+class BatchPlanner:
+    """
+    Packs LLM candidates into batches against a token budget and adapts the
+    item cap to what the API is doing.
+
+    Each batch is filled until the estimated prompt tokens, the estimated
+    output tokens, or the current item cap would be exceeded. The item cap
+    shrinks when batches come back slow or with a high share of missing /
+    invalid results, and grows again while they stay fast and clean.
+    """
+
+    def __init__(
+        self,
+        initial_items: int = 20,
+        min_items: int = 5,
+        max_items: int = 200,
+        max_prompt_tokens: int = 8000,
+        max_output_tokens: int = 4096,
+        target_latency: float = 10.0,
+        max_failure_rate: float = 0.1,
+        smoothing: float = 0.3
+    ):
+        self.min_items = max(1, min_items)
+        self.max_items = max(self.min_items, max_items)
+        self.items = float(min(max(initial_items, self.min_items), self.max_items))
+
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_output_tokens = max_output_tokens
+        self.target_latency = target_latency
+        self.max_failure_rate = max_failure_rate
+        self.smoothing = smoothing
+
+        self.avg_latency = None
+        self.avg_failure_rate = 0.0
+
+        self.prompt_overhead = estimate_tokens(build_batch_prompt([]))
+
+        self._lock = threading.Lock()
+
+    def item_tokens(self, item) -> int:
+        _, description = item
+        # The widest ordinal a batch can use, plus the newline
+        return estimate_tokens(format_transaction(self.max_items, description)) + 1
+
+    def plan(self, candidates):
+        """
+        Lazily yields batches from candidates, reading the current item cap
+        each time so feedback from finished batches shapes later ones.
+        """
+        batch = []
+        prompt_tokens = self.prompt_overhead
+
+        for item in candidates:
+            cost = self.item_tokens(item)
+            cap = self.current_items()
+
+            full = batch and (
+                len(batch) >= cap
+                or prompt_tokens + cost > self.max_prompt_tokens
+                or (len(batch) + 1) * OUTPUT_TOKENS_PER_ITEM > self.max_output_tokens
+            )
+
+            if full:
+                yield batch
+                batch = []
+                prompt_tokens = self.prompt_overhead
+
+            batch.append(item)
+            prompt_tokens += cost
+
+        if batch:
+            yield batch
+
+    def current_items(self) -> int:
+        with self._lock:
+            return int(self.items)
+
+    def record(self, sent: int, valid: int, latency: float):
+        """Feedback from one request: items sent, valid results, seconds."""
+        if sent <= 0:
+            return
+
+        failure_rate = 1 - valid / sent
+
+        with self._lock:
+            a = self.smoothing
+            self.avg_latency = latency if self.avg_latency is None else (
+                a * latency + (1 - a) * self.avg_latency
+            )
+            self.avg_failure_rate = a * failure_rate + (1 - a) * self.avg_failure_rate
+
+            if (
+                self.avg_failure_rate > self.max_failure_rate
+                or self.avg_latency > self.target_latency
+            ):
+                self.items = max(self.min_items, self.items * 0.7)
+            elif self.avg_latency < self.target_latency / 2 and sent >= int(self.items):
+                # Only grow when full-size batches are proving healthy
+                self.items = min(self.max_items, self.items * 1.25)
@@ -0,0 +1,153 @@
+import re
+import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_reset_duration(value):
+    """
+    Parses Groq's x-ratelimit-reset-* values ("7.66s", "2m59.56s", "120ms")
+    into seconds. Returns None when the value is missing or unparseable.
+    """
+    if not value:
+        return None
+
+    parts = _DURATION_PART.findall(str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on the number of in-flight LLM requests.
+
+    Each success raises the limit by 1/limit (roughly +1 per round of
+    requests); each 429 multiplies it by `decrease` and pauses new requests
+    until the server's retry window has passed. Groq's x-ratelimit-*
+    headers are used to shrink the limit before a 429 happens.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 4,
+        min_in_flight: int = 1,
+        decrease: float = 0.5,
+        default_backoff: float = 1.0
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_in_flight = max(1, min(min_in_flight, self.max_in_flight))
+        self.decrease = decrease
+        self.default_backoff = default_backoff
+
+        self.limit = float(self.max_in_flight)
+        self.in_flight = 0
+        self.paused_until = 0.0
+
+        self.rate_limited = 0
+
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self.paused_until - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+    def on_success(self):
+        with self._cond:
+            self.limit = min(self.max_in_flight, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def on_rate_limited(self, retry_after=None):
+        with self._cond:
+            self.rate_limited += 1
+            self.limit = max(self.min_in_flight, self.limit * self.decrease)
+            self._pause(retry_after if retry_after is not None else self.default_backoff)
+
+    def observe_headers(self, headers):
+        remaining_requests = _header_int(headers, "x-ratelimit-remaining-requests")
+        remaining_tokens = _header_int(headers, "x-ratelimit-remaining-tokens")
+
+        with self._cond:
+            if remaining_requests is not None and remaining_requests < self.limit:
+                self.limit = max(self.min_in_flight, float(remaining_requests))
+
+            if remaining_requests == 0:
+                reset = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+                self._pause(reset if reset is not None else self.default_backoff)
+
+            if remaining_tokens == 0:
+                reset = parse_reset_duration(headers.get("x-ratelimit-reset-tokens"))
+                self._pause(reset if reset is not None else self.default_backoff)
+
+    def _pause(self, seconds):
+        # Caller holds the condition
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self._cond.notify_all()
+
+
+def _header_int(headers, name):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return None
+
+
+def dispatch_batches(batches, run_batch, max_in_flight: int = 4):
+    """
+    Runs run_batch(batch) for every batch on a bounded thread pool and
+    returns the per-batch results in input order, so merging them is
+    deterministic regardless of completion order. Request pacing is left
+    to the AdaptiveConcurrency limiter used inside run_batch.
+
+    `batches` may be a lazy iterable; a new batch is only pulled when a
+    worker frees up, so planners can react to earlier results.
+    """
+    workers = max(1, max_in_flight)
+    results = {}
+    pending = {}
+    batch_iter = enumerate(batches)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-batch") as pool:
+        def submit_next():
+            for position, batch in batch_iter:
+                pending[pool.submit(run_batch, batch)] = position
+                return
+
+        for _ in range(workers):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[pending.pop(future)] = future.result()
+                submit_next()
+
+    return [results[position] for position in range(len(results))]
@@ -1,31 +1,252 @@
 import os
-import requests
-from dotenv import load_dotenv
+import gzip
+import json
+import threading
 
-load_dotenv()
+DEFAULT_GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_MODEL = "openai/gpt-oss-120b"
 
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+_env_loaded = False
+_env_lock = threading.Lock()
 
 
-def call_groq(prompt: str):
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+def load_environment():
+    """
+    Reads .env once, on first use instead of at import, so importing this
+    module (e.g. for GROQ_MODEL) stays cheap and side-effect free.
+    """
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv
+            load_dotenv()
+            _env_loaded = True
 
-    payload = {
-        "model": "openai/gpt-oss-120b",
-        "temperature": 0,
-        "messages": [
-            {"role": "user", "content": prompt}
-        ]
-    }
 
-    response = requests.post(GROQ_URL, headers=headers, json=payload)
+def __getattr__(name):
+    # GROQ_API_KEY / GROQ_URL are resolved lazily, after .env is loaded.
+    # GROQ_URL can point at a local stand-in (see benchmarks/mock_groq_server.py)
+    if name == "GROQ_API_KEY":
+        load_environment()
+        return os.getenv("GROQ_API_KEY")
+    if name == "GROQ_URL":
+        load_environment()
+        return os.getenv("GROQ_URL", DEFAULT_GROQ_URL)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    if response.status_code != 200:
-        raise Exception(f"GROQ API Error: {response.text}")
 
-    return response.json()["choices"][0]["message"]["content"]
+class GroqAPIError(Exception):
+    def __init__(self, message: str, status_code: int = None, headers=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class GroqRateLimitError(GroqAPIError):
+    def __init__(self, message: str, headers=None):
+        super().__init__(message, status_code=429, headers=headers)
+        self.retry_after = _retry_after_seconds(self.headers)
+
+
+def _retry_after_seconds(headers):
+    retry_after = headers.get("retry-after")
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+    return None
+
+
+class GroqClient:
+    """
+    Reusable Groq chat-completions client.
+
+    A single requests.Session keeps TLS connections alive across batches;
+    its adapter pool is sized to the number of concurrent requests. Request
+    bodies above `compress_min_bytes` are gzip-compressed when `compress`
+    is on (opt-in); if the server rejects a compressed body with 400/415,
+    it is resent uncompressed and compression is turned off.
+    """
+
+    def __init__(
+        self,
+        api_key: str = None,
+        url: str = None,
+        model: str = GROQ_MODEL,
+        pool_size: int = 8,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        compress: bool = False,
+        compress_min_bytes: int = 1024
+    ):
+        # requests is only imported once a client is actually needed
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        load_environment()
+
+        self.url = url or os.getenv("GROQ_URL", DEFAULT_GROQ_URL)
+        self.model = model
+        self._request_error = requests.RequestException
+        self.timeout = (connect_timeout, read_timeout)
+        self.compress = compress
+        self.compress_min_bytes = compress_min_bytes
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key or os.getenv('GROQ_API_KEY')}",
+            "Content-Type": "application/json"
+        })
+
+    def _encode(self, payload):
+        body = json.dumps(payload).encode("utf-8")
+
+        if self.compress and len(body) >= self.compress_min_bytes:
+            return gzip.compress(body), {"Content-Encoding": "gzip"}
+
+        return body, {}
+
+    def _payload(self, prompt: str, stream: bool = False):
+        payload = {
+            "model": self.model,
+            "temperature": 0,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+
+        if stream:
+            payload["stream"] = True
+
+        return payload
+
+    def _send(self, body, extra_headers, stream: bool):
+        try:
+            return self.session.post(
+                self.url,
+                data=body,
+                headers=extra_headers,
+                timeout=self.timeout,
+                stream=stream
+            )
+        except self._request_error as e:
+            raise GroqAPIError(f"GROQ API Request Failed: {str(e)}")
+
+    def _post(self, payload, on_headers=None, stream: bool = False):
+        body, extra_headers = self._encode(payload)
+        response = self._send(body, extra_headers, stream)
+
+        if extra_headers and response.status_code in (400, 415):
+            # The endpoint doesn't take gzip bodies: resend plain, stop compressing
+            print("GROQ API rejected a compressed request; disabling compression")
+            response.close()
+            self.compress = False
+            body, extra_headers = self._encode(payload)
+            response = self._send(body, extra_headers, stream)
+
+        # Rate limit headers come back on successes and 429s alike
+        if on_headers is not None:
+            on_headers(response.headers)
+
+        if response.status_code == 429:
+            raise GroqRateLimitError(f"GROQ API Rate Limited: {response.text}", response.headers)
+
+        if response.status_code != 200:
+            raise GroqAPIError(
+                f"GROQ API Error: {response.text}",
+                status_code=response.status_code,
+                headers=response.headers
+            )
+
+        return response
+
+    def complete(self, prompt: str, on_headers=None):
+        response = self._post(self._payload(prompt), on_headers=on_headers)
+
+        # A garbled envelope is treated like a network failure (no status
+        # code, so transient): the retry loop resubmits the batch
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise GroqAPIError(f"GROQ API Malformed Response: {str(e)}")
+
+    def stream(self, prompt: str, on_headers=None):
+        """
+        Yields content fragments from a server-sent events completion as
+        they arrive.
+        """
+        response = self._post(
+            self._payload(prompt, stream=True),
+            on_headers=on_headers,
+            stream=True
+        )
+        response.encoding = "utf-8"
+
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                try:
+                    choices = json.loads(data).get("choices") or []
+                    content = (choices[0].get("delta") or {}).get("content") if choices else None
+                except (ValueError, AttributeError, IndexError, TypeError) as e:
+                    # A truncated or garbled event ends the stream; results
+                    # parsed so far are kept by the caller
+                    raise GroqAPIError(f"GROQ API Malformed Stream Event: {str(e)}")
+
+                if content:
+                    yield content
+        except self._request_error as e:
+            raise GroqAPIError(f"GROQ API Stream Failed: {str(e)}")
+        finally:
+            response.close()
+
+    def close(self):
+        self.session.close()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_default_client() -> GroqClient:
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            # Environment settings may come from .env
+            load_environment()
+            _default_client = GroqClient(
+                pool_size=int(os.getenv("GROQ_POOL_SIZE", "8")),
+                connect_timeout=float(os.getenv("GROQ_CONNECT_TIMEOUT", "5")),
+                read_timeout=float(os.getenv("GROQ_READ_TIMEOUT", "60")),
+                compress=os.getenv("GROQ_COMPRESS", "0") == "1"
+            )
+        return _default_client
+
+
+def set_default_client(client: GroqClient):
+    """Replaces the client used by call_groq/stream_groq; returns the old one."""
+    global _default_client
+    with _default_client_lock:
+        previous, _default_client = _default_client, client
+        return previous
+
+
+def call_groq(prompt: str, on_headers=None):
+    return get_default_client().complete(prompt, on_headers=on_headers)
+
+
+def stream_groq(prompt: str, on_headers=None):
+    return get_default_client().stream(prompt, on_headers=on_headers)
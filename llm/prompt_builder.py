@@ -1,41 +1,57 @@
+import json
+import math
+
 from config.categories import CATEGORIES, CATEGORY_DESCRIPTIONS
 
+MAX_DESCRIPTION_CHARS = 120
 
-def build_batch_prompt(items):
-    """
-    items: list of tuples (id, description)
-    """
 
+def _build_static_prefix():
     categories_text = "\n".join(
-        [f"- {cat}: {CATEGORY_DESCRIPTIONS[cat]}" for cat in CATEGORIES]
+        [f"{cat}: {CATEGORY_DESCRIPTIONS[cat]}" for cat in CATEGORIES]
     )
 
-    transactions_text = "\n".join(
-        [f'{item_id}: "{desc}"' for item_id, desc in items]
+    # Everything up to the transaction list is identical for every batch,
+    # so provider-side prompt caching can reuse it.
+    return (
+        "You are an expense categorization assistant.\n"
+        "Classify each transaction into ONE of these categories:\n"
+        f"{categories_text}\n"
+        "Reply with JSON only: "
+        '{"results":[{"id":<id>,"category":"<category>","confidence":<0 to 1>}]}\n'
+        "Transactions (id|description):\n"
     )
 
-    prompt = f"""
-You are an expense categorization assistant.
 
-Classify each transaction into ONE of the categories below.
+STATIC_PREFIX = _build_static_prefix()
+
+
+def format_transaction(ordinal: int, description, max_chars: int = MAX_DESCRIPTION_CHARS) -> str:
+    text = " ".join(str(description).split())[:max_chars]
+    # JSON string escaping keeps quotes/newlines from breaking the line format
+    return f"{ordinal}|{json.dumps(text, ensure_ascii=False)}"
+
+
+def build_batch_prompt(items, max_chars: int = MAX_DESCRIPTION_CHARS):
+    """
+    items: list of tuples (id, description)
+
+    Transactions are numbered 0..n-1 within the batch; the model answers
+    with those ordinals and callers map them back to their own ids by
+    position in `items`.
+    """
+
+    transactions_text = "\n".join(
+        [format_transaction(ordinal, desc, max_chars) for ordinal, (_, desc) in enumerate(items)]
+    )
 
-Categories:
-{categories_text}
+    return STATIC_PREFIX + transactions_text
 
-Transactions:
-{transactions_text}
 
-Respond ONLY in valid JSON format:
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English text with BPE tokenizers
+    return math.ceil(len(text) / 4)
 
-{{
-  "results": [
-    {{
-      "id": <transaction id>,
-      "category": "<one category>",
-      "confidence": <0 to 1>
-    }}
-  ]
-}}
-"""
 
-    return prompt
+def estimate_prompt_tokens(items, max_chars: int = MAX_DESCRIPTION_CHARS) -> int:
+    return estimate_tokens(build_batch_prompt(items, max_chars))
@@ -0,0 +1,115 @@
+import time
+import random
+import threading
+
+from llm.groq_client import GroqAPIError, GroqRateLimitError
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_retries: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 8.0,
+        max_rate_limit_retries: int = 5
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_rate_limit_retries = max_rate_limit_retries
+
+    def backoff(self, attempt: int) -> float:
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class RetryStats:
+    """Thread-safe counters for one categorization run."""
+
+    FIELDS = ("requests", "retries", "rate_limited", "recovered_rows", "failed_rows")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                self._counts[name] += value
+
+    def as_dict(self):
+        with self._lock:
+            return dict(self._counts)
+
+
+def is_transient(error: GroqAPIError) -> bool:
+    # Network failures and server-side errors are worth another attempt;
+    # other 4xx responses (bad key, bad request) will fail the same way.
+    status = error.status_code
+    return status is None or status == 408 or status >= 500
+
+
+def categorize_with_retry(
+    batch_items,
+    categorize_batch,
+    limiter,
+    policy: RetryPolicy,
+    stats: RetryStats,
+    on_attempt=None
+):
+    """
+    Calls categorize_batch(items, on_headers=...) until every id in
+    batch_items has a valid result or the retry budget is spent. After a
+    partial response only the missing ids are resubmitted.
+
+    on_attempt(sent, valid, latency) is called after every request that
+    was not rate limited.
+    """
+    pending = list(batch_items)
+    collected = {}
+    attempt = 0
+    rate_limited = 0
+
+    while pending:
+        results = []
+        started = time.monotonic()
+
+        try:
+            with limiter:
+                stats.add(requests=1)
+                started = time.monotonic()
+                results = categorize_batch(pending, on_headers=limiter.observe_headers)
+            limiter.on_success()
+        except GroqRateLimitError as e:
+            limiter.on_rate_limited(e.retry_after)
+            stats.add(rate_limited=1)
+            rate_limited += 1
+            if rate_limited > policy.max_rate_limit_retries:
+                break
+            continue
+        except GroqAPIError as e:
+            if not is_transient(e):
+                raise
+            print("LLM Request Error:", e)
+
+        if on_attempt is not None:
+            on_attempt(len(pending), len(results), time.monotonic() - started)
+
+        if attempt > 0:
+            stats.add(recovered_rows=len(results))
+
+        for result in results:
+            collected[result.id] = result
+
+        pending = [item for item in pending if item[0] not in collected]
+
+        if not pending or attempt >= policy.max_retries:
+            break
+
+        attempt += 1
+        stats.add(retries=1)
+        time.sleep(policy.backoff(attempt))
+
+    stats.add(failed_rows=len(pending))
+
+    return list(collected.values())
@@ -0,0 +1,60 @@
+import json
+
+
+class IncrementalResultParser:
+    """
+    Pulls complete result objects out of a streamed
+    {"results": [{...}, {...}]} response as soon as each one closes.
+
+    feed() accepts arbitrary text fragments and returns the objects that
+    were completed by that fragment. Braces inside JSON strings are
+    ignored, and any text around the JSON (e.g. code fences) is skipped.
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._item = None
+
+    def feed(self, text: str):
+        completed = []
+
+        for char in text:
+            if self._item is not None:
+                self._item.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+                # Depth 1 is the wrapper object, depth 2 a result item
+                if self._depth == 2:
+                    self._item = ["{"]
+            elif char == "}":
+                if self._depth == 2 and self._item is not None:
+                    obj = self._decode("".join(self._item))
+                    if obj is not None:
+                        completed.append(obj)
+                    self._item = None
+                self._depth = max(0, self._depth - 1)
+
+        return completed
+
+    @staticmethod
+    def _decode(raw: str):
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            return None
+        return obj if isinstance(obj, dict) else None